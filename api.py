@@ -0,0 +1,301 @@
+"""
+Read-only JSON API for the numbers the app computes.
+
+Endpoints:
+    GET /api/performance                       performance table, one record per ETF
+    GET /api/history?start=&end=&limit=        daily invested/current value and gain/loss
+    GET /api/quotes                            last price and daily change of the watchlist
+
+Responses carry an ETag and Last-Modified and answer conditional requests with 304,
+are gzip-compressed when the client accepts it, and are only recomputed when the
+portfolio, the watchlist or the shared price cache changed.
+
+Usage:
+    python api.py --port 8502 --token <TOKEN>
+or set API_PORT (and API_TOKEN) in the Streamlit secrets to serve it from the app
+process, sharing its price cache.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import threading
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+import pandas as pd
+
+from utils import actions, finance, fx, live, portfolio, prices, watchlist
+
+SOURCE_TTL = 60  # seconds between reloads of the portfolio and watchlist
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 5000
+
+class ApiState:
+    """
+    Computes the API payloads and caches the encoded responses.
+    Cached bodies are reused while the data version (portfolio, watchlist,
+    price cache and live quotes) is unchanged.
+    """
+
+    def __init__(self, base_currency="EUR"):
+        self.base_currency = base_currency
+        self._lock = threading.Lock()
+        self._sources = None
+        self._sources_at = 0
+        self._prices = None
+        self._version = None
+        self._frames = {}
+        self._responses = {}  # (path, query) -> (etag, last_modified, body, gzipped body)
+        self._etags = {}      # (path, query) -> (etag, last_modified) surviving version changes
+
+    def _load_sources(self):
+        """Portfolio and watchlist, reloaded at most every SOURCE_TTL seconds."""
+        if self._sources is None or time.time() - self._sources_at > SOURCE_TTL:
+            port_df = portfolio.load_portfolio()
+            if not port_df.empty:
+                port_df['Date'] = pd.to_datetime(port_df['Date'])
+            self._sources = (port_df, watchlist.load_watchlist())
+            self._sources_at = time.time()
+        return self._sources
+
+    def _load_prices(self, port_df, watch):
+        """
+        Reads the portfolio and watchlist panels from the shared price cache.
+        Cheap when cached; refreshes stale symbols before the data version is taken.
+        """
+        port_history = pd.DataFrame()
+        fx_rates = None
+        corporate_actions = None
+        if not port_df.empty:
+            tickers = port_df['Ticker'].unique().tolist()
+            port_history = finance.get_historical_prices(tickers, port_df['Date'].min())
+            fx_rates = fx.get_ticker_rates(tickers, self.base_currency, port_df['Date'].min())
+            corporate_actions = finance.get_corporate_actions(tickers)
+        watch_history = pd.DataFrame()
+        if watch:
+            start = pd.Timestamp.now().normalize() - pd.Timedelta(days=10)
+            watch_history = finance.get_historical_prices(watch, start)
+        return port_history, watch_history, fx_rates, corporate_actions
+
+    def _data_version(self, port_df, watch):
+        fingerprint = int(pd.util.hash_pandas_object(port_df, index=False).sum()) if not port_df.empty else 0
+        poller = live.get_poller()
+        quote_versions = tuple(poller.peek(symbol)[0] for symbol in watch)
+        return (prices.get_store().version, actions.get_store().version, fingerprint, tuple(watch), quote_versions)
+
+    def _live_prices(self, symbols):
+        poller = live.get_poller()
+        quotes = {}
+        for symbol in symbols:
+            quote = poller.peek(symbol)[1]
+            if quote and quote.get('price') is not None:
+                quotes[symbol] = quote['price']
+        return quotes
+
+    def _frame(self, name):
+        """Computes (once per data version) the full table behind an endpoint."""
+        if name in self._frames:
+            return self._frames[name]
+
+        port_df, _ = self._sources
+        port_history, watch_history, fx_rates, corporate_actions = self._prices
+        if name == 'quotes':
+            history = watch_history.ffill()
+            if history.empty:
+                frame = pd.DataFrame(columns=['Symbol', 'Price', 'Change', 'Change %', 'Date'])
+            else:
+                last = history.iloc[-1].copy()
+                last.update(pd.Series(self._live_prices(history.columns), dtype=float))
+                prev = history.iloc[-2] if len(history) > 1 else last
+                frame = pd.DataFrame({
+                    'Symbol': history.columns,
+                    'Price': last.values,
+                    'Change': (last - prev).values,
+                    'Change %': ((last / prev - 1) * 100).values,
+                    'Date': history.index[-1].strftime('%Y-%m-%d'),
+                })
+        elif port_df.empty:
+            frame = pd.DataFrame()
+        elif name == 'performance':
+            # Latest close, or the live quote when the poller has one
+            current_prices = port_history.ffill().iloc[-1].dropna().to_dict() if not port_history.empty else {}
+            current_prices.update(self._live_prices(port_history.columns))
+            frame = portfolio.calculate_performance(port_df, current_prices, port_history, fx_rates, corporate_actions)
+        else:
+            frame = portfolio.calculate_historical_performance(port_df, port_history, fx_rates, corporate_actions)
+        self._frames[name] = frame
+        return frame
+
+    def _payload(self, path, params):
+        if path == '/api/performance':
+            return {'currency': self.base_currency, 'data': _records(self._frame('performance'))}
+        if path == '/api/quotes':
+            return {'data': _records(self._frame('quotes'))}
+        if path == '/api/history':
+            history = self._frame('history')
+            start = params.get('start')
+            end = params.get('end')
+            limit = min(int(params.get('limit', DEFAULT_LIMIT)), MAX_LIMIT)
+            if limit < 1:
+                raise ValueError("limit must be positive")
+            if not history.empty:
+                history = history.loc[pd.Timestamp(start) if start else None:pd.Timestamp(end) if end else None]
+
+            page = history.iloc[:limit]
+            next_page = None
+            if len(history) > limit:
+                query = {'start': history.index[limit].strftime('%Y-%m-%d'), 'limit': limit}
+                if end:
+                    query['end'] = end
+                next_page = f"/api/history?{urlencode(query)}"
+            return {'currency': self.base_currency, 'data': _records(page.reset_index()), 'next': next_page}
+        return None
+
+    def get(self, path, params):
+        """
+        Returns (etag, last_modified, body, gzipped body) for a request, or None for unknown paths.
+        Raises ValueError for invalid parameters.
+        """
+        key = (path, tuple(sorted(params.items())))
+        with self._lock:
+            sources = self._load_sources()
+            self._prices = self._load_prices(*sources)
+            version = self._data_version(*sources)
+            if version != self._version:
+                self._version = version
+                self._frames = {}
+                self._responses = {}
+            if key in self._responses:
+                return self._responses[key]
+
+            payload = self._payload(path, params)
+            if payload is None:
+                return None
+            body = json.dumps(payload, default=str).encode('utf-8')
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+
+            # Last-Modified only moves when the content actually changed
+            if len(self._etags) > 1000:
+                self._etags = {}
+            previous = self._etags.get(key)
+            last_modified = previous[1] if previous and previous[0] == etag else time.time()
+            self._etags[key] = (etag, last_modified)
+
+            response = (etag, last_modified, body, gzip.compress(body))
+            self._responses[key] = response
+            return response
+
+def _records(df):
+    """DataFrame -> list of dicts with ISO dates and null for NaN."""
+    if df.empty:
+        return []
+    return json.loads(df.to_json(orient='records', date_format='iso'))
+
+_state = ApiState()
+
+class ApiHandler(BaseHTTPRequestHandler):
+    token = None
+
+    def do_GET(self):
+        if self.token and self.headers.get('Authorization') != f"Bearer {self.token}":
+            return self._send_error(401, "Unauthorized")
+
+        url = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        try:
+            response = _state.get(url.path.rstrip('/'), params)
+        except ValueError as e:
+            return self._send_error(400, str(e))
+        except Exception as e:
+            print(f"Error serving {self.path}: {e}")
+            return self._send_error(500, "Internal error")
+        if response is None:
+            return self._send_error(404, "Not found")
+
+        etag, last_modified, body, gzipped = response
+        if self._not_modified(etag, last_modified):
+            self.send_response(304)
+            self._send_cache_headers(etag, last_modified)
+            self.end_headers()
+            return
+
+        use_gzip = 'gzip' in self.headers.get('Accept-Encoding', '')
+        content = gzipped if use_gzip else body
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        if use_gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        self._send_cache_headers(etag, last_modified)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _not_modified(self, etag, last_modified):
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            # If-None-Match takes precedence over If-Modified-Since
+            return if_none_match.strip() == '*' or etag in [t.strip() for t in if_none_match.split(',')]
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since:
+            try:
+                return int(last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def _send_cache_headers(self, etag, last_modified):
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', formatdate(last_modified, usegmt=True))
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Vary', 'Accept-Encoding, Authorization')
+
+    def _send_error(self, status, message):
+        body = json.dumps({'error': message}).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+_server = None
+_server_lock = threading.Lock()
+
+def start_server(port, host="127.0.0.1", token=None, base_currency="EUR"):
+    """Serves the API from a background thread of this process (once per process)."""
+    global _server
+    with _server_lock:
+        if _server is not None:
+            return _server
+        ApiHandler.token = token or None
+        _state.base_currency = base_currency
+        _server = ThreadingHTTPServer((host, port), ApiHandler)
+        threading.Thread(target=_server.serve_forever, name="json-api", daemon=True).start()
+        print(f"JSON API listening on http://{host}:{port}/api")
+        return _server
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve portfolio metrics as a read-only JSON API.")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8502, help="Port (default: 8502)")
+    parser.add_argument("--token", default=None, help="Require 'Authorization: Bearer <token>'")
+    parser.add_argument("--currency", default="EUR", help="Base currency for portfolio values (default: EUR)")
+    args = parser.parse_args(argv)
+
+    ApiHandler.token = args.token
+    _state.base_currency = args.currency.upper()
+    server = ThreadingHTTPServer((args.host, args.port), ApiHandler)
+    print(f"JSON API listening on http://{args.host}:{args.port}/api")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    main()
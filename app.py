@@ -1,11 +1,48 @@
+import time
+_script_start = time.perf_counter()
+
 import streamlit as st
-import pandas as pd
-import plotly.graph_objects as go
-from datetime import datetime
-from utils import finance, portfolio, watchlist
+from utils.timing import StartupTimer
+
+startup = StartupTimer(_script_start)
 
 # Page config
 st.set_page_config(page_title="ETF Tracker", page_icon="📈", layout="wide")
+startup.mark("streamlit")
+
+# Optional JSON API and the alert engine, started with the process so they don't wait for a login
+from utils import services
+services.start(
+    api_port=st.secrets.get("API_PORT"),
+    api_token=st.secrets.get("API_TOKEN"),
+    base_currency=st.secrets.get("BASE_CURRENCY", "EUR"),
+    webhook_url=st.secrets.get("ALERT_WEBHOOK_URL", "")
+)
+
+# Authentication
+if "authenticated" not in st.session_state:
+    st.session_state["authenticated"] = False
+
+def check_password():
+    if st.session_state["password_input"] == st.secrets.get("APP_PASSWORD", "admin"):
+        st.session_state["authenticated"] = True
+        del st.session_state["password_input"]
+    else:
+        st.error("Password errata")
+
+if not st.session_state["authenticated"]:
+    st.title("🔒 Accesso Richiesto")
+    st.text_input("Inserisci Password", type="password", key="password_input", on_change=check_password)
+    startup.mark("login page")
+    startup.log("login")
+    st.stop()
+
+# Heavy modules are only needed once logged in
+import pandas as pd
+import plotly.graph_objects as go
+from datetime import datetime
+from utils import finance, portfolio, watchlist, risk, live, projection, rebalance, screener, alerts, fx
+startup.mark("imports")
 
 # Initialize session state for watchlist
 if "watchlist" not in st.session_state:
@@ -13,6 +50,14 @@ if "watchlist" not in st.session_state:
     saved_watchlist = watchlist.load_watchlist()
     st.session_state["watchlist"] = saved_watchlist if saved_watchlist else []
 
+# Canonicalize raw tickers (e.g. SXR8 -> SXR8.DE) in one batch before anything renders them,
+# and persist the resolved symbols once instead of rerunning per ticker
+canonical_watchlist = finance.canonicalize_symbols(st.session_state["watchlist"])
+if canonical_watchlist != st.session_state["watchlist"]:
+    st.session_state["watchlist"] = canonical_watchlist
+    watchlist.save_watchlist(canonical_watchlist)
+startup.mark("sheets")
+
 # Sidebar - ISIN Search & Watchlist
 with st.sidebar:
     st.header("🔍 Search ETF")
@@ -28,10 +73,11 @@ with st.sidebar:
                     st.session_state["search_results"] = results
                 else:
                     # API failed or no results - try direct resolution
-                    if isin_input not in st.session_state["watchlist"]:
-                        st.session_state["watchlist"].append(isin_input)
+                    symbol = finance.canonicalize_symbols([isin_input])[0]
+                    if symbol not in st.session_state["watchlist"]:
+                        st.session_state["watchlist"].append(symbol)
                         watchlist.save_watchlist(st.session_state["watchlist"])
-                        st.success(f"✅ Added '{isin_input}' to watchlist!")
+                        st.success(f"✅ Added '{symbol}' to watchlist!")
                         st.info("Go to Dashboard to see the data.")
                         st.session_state["search_results"] = []
                     else:
@@ -49,10 +95,11 @@ with st.sidebar:
                 st.caption(f"{res['longname']} ({res['exchange']})")
             with col2:
                 if st.button("➕", key=f"add_{res['symbol']}"):
-                    if res['symbol'] not in st.session_state["watchlist"]:
-                        st.session_state["watchlist"].append(res['symbol'])
+                    symbol = finance.canonicalize_symbols([res['symbol']])[0]
+                    if symbol not in st.session_state["watchlist"]:
+                        st.session_state["watchlist"].append(symbol)
                         watchlist.save_watchlist(st.session_state["watchlist"])
-                        st.success(f"Added {res['symbol']}")
+                        st.success(f"Added {symbol}")
                     else:
                         st.warning("Already in list")
 
@@ -71,26 +118,28 @@ with st.sidebar:
     else:
         st.info("Your watchlist is empty.")
 
-# Authentication
-if "authenticated" not in st.session_state:
-    st.session_state["authenticated"] = False
+    st.divider()
+    default_currency = st.secrets.get("BASE_CURRENCY", "EUR")
+    base_currency = st.selectbox(
+        "💱 Base Currency",
+        options=fx.BASE_CURRENCIES,
+        index=fx.BASE_CURRENCIES.index(default_currency) if default_currency in fx.BASE_CURRENCIES else 0,
+        help="Portfolio values are converted to this currency"
+    )
+    cs = fx.CURRENCY_SYMBOLS.get(base_currency, base_currency)
 
-def check_password():
-    if st.session_state["password_input"] == st.secrets.get("APP_PASSWORD", "admin"):
-        st.session_state["authenticated"] = True
-        del st.session_state["password_input"]
-    else:
-        st.error("Password errata")
-
-if not st.session_state["authenticated"]:
-    st.title("🔒 Accesso Richiesto")
-    st.text_input("Inserisci Password", type="password", key="password_input", on_change=check_password)
-    st.stop()
+    # Render timing of this run up to the sidebar (imports are only paid on the first run of the process)
+    startup.mark("sidebar")
+    with st.expander("⏱️ Startup Timing"):
+        st.dataframe(startup.report(), hide_index=True, column_config={
+            "ms": st.column_config.NumberColumn("ms", format="%.0f")
+        })
+startup.log()
 
 # Main Content
 st.title("📈 ETF Tracker & Portfolio")
 
-tab1, tab2 = st.tabs(["💰 Portfolio", "📊 Dashboard"])
+tab1, tab2, tab3, tab4 = st.tabs(["💰 Portfolio", "📊 Dashboard", "🛡️ Risk", "🔔 Alerts"])
 
 # --- TAB 1: PORTFOLIO ---
 with tab1:
@@ -123,6 +172,35 @@ with tab1:
                 else:
                     st.error("Enter all required data.")
 
+    # Bulk Import from broker export files
+    with st.expander("📥 Bulk Import"):
+        st.caption("Upload a broker export (CSV) with date, ticker, price and quantity columns. "
+                   "Rows already in the portfolio are skipped.")
+        uploaded = st.file_uploader("Transactions file", type=["csv", "txt"])
+        if uploaded is not None:
+            try:
+                # Let pandas sniff the delimiter (brokers use , or ;)
+                raw_import = pd.read_csv(uploaded, sep=None, engine="python", dtype=str)
+                st.write(f"{len(raw_import)} rows found.")
+                if st.button("Import Transactions"):
+                    with st.spinner("Importing..."):
+                        # New tickers get the listing quoted in the base currency, if there is one
+                        result = portfolio.import_transactions(
+                            raw_import,
+                            resolver=lambda t: finance.resolve_symbol(t, preferred_currency=base_currency)
+                        )
+                    imported = result['imported']
+                    st.success(f"Imported {len(imported)} transactions, skipped {result['duplicates']} duplicates.")
+                    if not result['rejected'].empty:
+                        st.warning(f"{len(result['rejected'])} rows could not be imported.")
+                        st.dataframe(result['rejected'], width='stretch')
+                    # Add new tickers to watchlist if not present
+                    for t in imported['Ticker'].unique():
+                        if t not in st.session_state["watchlist"]:
+                            st.session_state["watchlist"].append(t)
+            except Exception as e:
+                st.error(f"Error importing file: {e}")
+
     # Display Portfolio
     port_df = portfolio.load_portfolio()
     
@@ -171,7 +249,25 @@ with tab1:
         except Exception:
             raw_history = pd.DataFrame()
         
-        perf_df = portfolio.calculate_performance(port_df, current_prices, raw_history)
+        # Reinvest distributions and carry trades across splits; events are cached per symbol
+        try:
+            corporate_actions = finance.get_corporate_actions(all_tickers)
+            port_df, raw_history = portfolio.apply_corporate_actions(port_df, raw_history, corporate_actions)
+        except Exception as e:
+            st.warning(f"Could not apply dividends and splits: {e}")
+        
+        # Convert once to the base currency: trade prices at their date's rate, history at daily rates.
+        # Currencies come cached with the symbol resolution and FX pairs from the price store.
+        try:
+            fx_rates = fx.get_ticker_rates(all_tickers, base_currency, port_df['Date'].min())
+            port_df, current_prices, raw_history = portfolio.to_base_currency(port_df, current_prices, raw_history, fx_rates)
+        except Exception as e:
+            st.warning(f"Could not convert to {base_currency}: {e}")
+        
+        # The Total row carries the portfolio-level money- and time-weighted returns
+        perf_df = portfolio.calculate_performance(port_df, current_prices, raw_history, include_total=True)
+        total_row = perf_df[perf_df['Ticker'] == portfolio.TOTAL_LABEL] if not perf_df.empty else perf_df
+        perf_df = perf_df[perf_df['Ticker'] != portfolio.TOTAL_LABEL] if not perf_df.empty else perf_df
         
         if not perf_df.empty:
             st.subheader("Portfolio Performance")
@@ -182,10 +278,16 @@ with tab1:
             total_gain = total_value - total_invested
             total_gain_pct = (total_gain / total_invested) * 100 if total_invested != 0 else 0
             
-            m1, m2, m3 = st.columns(3)
-            m1.metric("Total Value", f"€ {total_value:,.2f}")
-            m2.metric("Invested", f"€ {total_invested:,.2f}")
-            m3.metric("Total Gain/Loss", f"€ {total_gain:,.2f}", f"{total_gain_pct:.2f}%")
+            # Portfolio-level money- and time-weighted returns
+            total_xirr = total_row['XIRR %'].iloc[0]
+            total_twr = total_row['TWR %'].iloc[0]
+            
+            m1, m2, m3, m4, m5 = st.columns(5)
+            m1.metric("Total Value", f"{cs} {total_value:,.2f}")
+            m2.metric("Invested", f"{cs} {total_invested:,.2f}")
+            m3.metric("Total Gain/Loss", f"{cs} {total_gain:,.2f}", f"{total_gain_pct:.2f}%")
+            m4.metric("Money-Weighted (XIRR)", f"{total_xirr:.2f}%" if pd.notnull(total_xirr) else "n/a")
+            m5.metric("Time-Weighted (TWR)", f"{total_twr:.2f}%" if pd.notnull(total_twr) else "n/a")
             
             # Detailed Table - Sort by Annualized Return % descending
             perf_df_sorted = perf_df.sort_values('Annualized Return %', ascending=False)
@@ -196,7 +298,8 @@ with tab1:
             
             # Reorder columns to show Name, Ticker, then other metrics
             cols = ['Name', 'Ticker', 'Quantity', 'Buy Price', 'Current Price', 
-                    'Invested Value', 'Current Value', 'Gain/Loss', 'Gain/Loss %', 'Annualized Return %']
+                    'Invested Value', 'Current Value', 'Gain/Loss', 'Gain/Loss %', 'Annualized Return %',
+                    'XIRR %', 'TWR %']
             perf_df_sorted = perf_df_sorted[cols]
             
             st.dataframe(
@@ -212,13 +315,23 @@ with tab1:
                         format="%.2f%%",
                         help="Projected annual return (if held <1yr) or actual 1-year return (if held ≥1yr)"
                     ),
+                    "XIRR %": st.column_config.NumberColumn(
+                        "XIRR %",
+                        format="%.2f%%",
+                        help="Money-weighted annual return, accounting for the timing of every purchase"
+                    ),
+                    "TWR %": st.column_config.NumberColumn(
+                        "TWR %",
+                        format="%.2f%%",
+                        help="Time-weighted annual return, independent of when money was added"
+                    ),
                     "Current Value": st.column_config.NumberColumn(
                         "Current Value",
-                        format="€ %.2f"
+                        format=f"{cs} %.2f"
                     ),
                      "Invested Value": st.column_config.NumberColumn(
                         "Invested",
-                        format="€ %.2f"
+                        format=f"{cs} %.2f"
                     )
                 }
             )
@@ -229,14 +342,7 @@ with tab1:
         st.subheader("💶 Daily Absolute Gain/Loss")
         
         try:
-            # Ensure Date column is datetime
-            port_df['Date'] = pd.to_datetime(port_df['Date'])
-            first_purchase_date = port_df['Date'].min()
-            
-            # Fetch raw historical prices for all tickers from the very first purchase
-            all_tickers = port_df['Ticker'].unique().tolist()
-            raw_history = finance.get_historical_prices(all_tickers, first_purchase_date)
-            
+            # raw_history (loaded above from the very first purchase) is reused here
             # Calculate historical performance
             hist_perf = portfolio.calculate_historical_performance(port_df, raw_history)
             
@@ -254,14 +360,14 @@ with tab1:
                     y=hist_perf['Gain/Loss'],
                     fill='tozeroy',
                     mode='lines',
-                    name='Gain/Loss (€)',
+                    name=f'Gain/Loss ({cs})',
                     line=dict(color='#00CC96') # Green-ish
                 ))
                 
                 fig_gl.update_layout(
-                    title="Total Portfolio Gain/Loss (€)",
+                    title=f"Total Portfolio Gain/Loss ({cs})",
                     xaxis_title="Date",
-                    yaxis_title="Gain/Loss (€)",
+                    yaxis_title=f"Gain/Loss ({cs})",
                     hovermode="x unified",
                     height=400,
                     margin=dict(l=0, r=0, t=30, b=0)
@@ -270,7 +376,7 @@ with tab1:
                 
                 # Show current metrics from history to verify
                 last_day = hist_perf.iloc[-1]
-                st.metric("Current Absolute Gain/Loss", f"€ {last_day['Gain/Loss']:,.2f}")
+                st.metric("Current Absolute Gain/Loss", f"{cs} {last_day['Gain/Loss']:,.2f}")
                 
             else:
                 st.warning("Not enough data to calculate historical performance.")
@@ -280,20 +386,110 @@ with tab1:
 
         st.divider()
 
+        # --- Per-ETF Contribution ---
+        st.subheader("🧩 Gain/Loss by ETF")
+        
+        try:
+            contributions = portfolio.calculate_contributions(port_df, raw_history)
+            
+            if contributions and not contributions['Gain/Loss'].empty:
+                contribution_window = st.radio(
+                    "Window",
+                    options=["1mo", "3mo", "ytd", "1y", "all"],
+                    format_func=lambda x: {
+                        "1mo": "1 Month",
+                        "3mo": "3 Months",
+                        "ytd": "YTD",
+                        "1y": "1 Year",
+                        "all": "All"
+                    }[x],
+                    index=4,
+                    horizontal=True
+                )
+                
+                pnl = contributions['Gain/Loss']
+                last_date = pnl.index[-1]
+                window_start = {
+                    "1mo": last_date - pd.DateOffset(months=1),
+                    "3mo": last_date - pd.DateOffset(months=3),
+                    "ytd": last_date.replace(month=1, day=1),
+                    "1y": last_date - pd.DateOffset(years=1),
+                    "all": pnl.index[0]
+                }[contribution_window]
+                
+                # Gain/loss of each ETF since the start of the window
+                window_pnl = pnl[pnl.index >= window_start]
+                if contribution_window != "all":
+                    window_pnl = window_pnl - window_pnl.iloc[0]
+                window_pnl = window_pnl.rename(columns=ticker_names)
+                
+                fig_contrib = go.Figure()
+                for column in window_pnl.columns:
+                    fig_contrib.add_trace(go.Scatter(
+                        x=window_pnl.index,
+                        y=window_pnl[column],
+                        mode='lines',
+                        stackgroup='one',
+                        name=column,
+                        hovertemplate=f'{cs} %{{y:,.2f}}<extra></extra>'
+                    ))
+                fig_contrib.update_layout(
+                    title=f"Gain/Loss Contribution by ETF ({cs})",
+                    xaxis_title="Date",
+                    yaxis_title=f"Gain/Loss ({cs})",
+                    hovermode="x unified",
+                    height=400,
+                    margin=dict(l=0, r=0, t=30, b=0)
+                )
+                st.plotly_chart(fig_contrib, config={'responsive': True})
+            else:
+                st.warning("Not enough data to calculate contributions.")
+        except Exception as e:
+            st.error(f"Error calculating contributions: {e}")
+
+        st.divider()
+
         # Comparative Chart
         st.subheader("📈 Comparative Performance")
         
-        # Find the most recent purchase date
         try:
             # Ensure Date column is datetime
             port_df['Date'] = pd.to_datetime(port_df['Date'])
+            first_purchase_date = port_df['Date'].min()
             last_purchase_date = port_df['Date'].max()
             
-            st.caption(f"Performance comparison starting from the last purchase date: {last_purchase_date.strftime('%d %B %Y')}")
+            c1, c2 = st.columns(2)
+            with c1:
+                comp_start_option = st.selectbox(
+                    "Compare From",
+                    options=["last", "first", "ytd", "custom"],
+                    format_func=lambda x: {
+                        "last": "Last Purchase",
+                        "first": "First Purchase",
+                        "ytd": "Year to Date",
+                        "custom": "Custom"
+                    }[x],
+                    index=0
+                )
+            with c2:
+                if comp_start_option == "custom":
+                    comp_start = pd.Timestamp(st.date_input(
+                        "Start Date",
+                        last_purchase_date.date(),
+                        min_value=first_purchase_date.date(),
+                        max_value=datetime.today()
+                    ))
+                else:
+                    comp_start = {
+                        "last": last_purchase_date,
+                        "first": first_purchase_date,
+                        "ytd": pd.Timestamp(datetime.today().year, 1, 1)
+                    }[comp_start_option]
             
-            # Fetch history
-            all_tickers = port_df['Ticker'].unique().tolist()
-            comp_data = finance.get_comparative_data(all_tickers, last_purchase_date)
+            st.caption(f"Performance comparison starting from {comp_start.strftime('%d %B %Y')}")
+            
+            # Rebase the already-loaded price history instead of refetching it
+            comp_data = finance.rebase_prices(raw_history, comp_start)
             
             if not comp_data.empty:
                 # Rename columns to use ETF Names
@@ -323,100 +519,545 @@ with tab1:
                 
         except Exception as e:
             st.error(f"Error generating chart: {e}")
+
+        st.divider()
+
+        # Monte Carlo projection of future portfolio value
+        st.subheader("🔮 Projection")
+        
+        with st.form("projection_form"):
+            c1, c2, c3, c4 = st.columns(4)
+            with c1:
+                proj_years = st.slider("Years", min_value=1, max_value=40, value=10)
+            with c2:
+                proj_paths = st.selectbox("Simulations", options=[1000, 10000, 100000], index=1, format_func=lambda x: f"{x:,}")
+            with c3:
+                proj_contribution = st.number_input(f"Monthly Contribution ({cs})", min_value=0.0, value=0.0, step=50.0)
+            with c4:
+                proj_method = st.selectbox(
+                    "Model",
+                    options=["bootstrap", "normal"],
+                    format_func=lambda x: {"bootstrap": "Historical Bootstrap", "normal": "Normal"}[x]
+                )
+            run_projection = st.form_submit_button("Run Projection")
+        
+        if run_projection:
+            try:
+                holdings_values = perf_df.set_index('Ticker')['Current Value'] if not perf_df.empty else pd.Series(dtype=float)
+                with st.spinner("Simulating..."):
+                    fan = projection.simulate_projection(
+                        raw_history,
+                        holdings_values,
+                        years=proj_years,
+                        n_paths=proj_paths,
+                        contribution=proj_contribution,
+                        method=proj_method
+                        # Single process here: the worker pool is for headless runs, not the server process
+                    )
+                
+                fig_fan = go.Figure()
+                # Outer band (5-95) then inner band (25-75), each filled down to its lower edge
+                for low, high, color in [("P5", "P95", "rgba(0,204,150,0.15)"), ("P25", "P75", "rgba(0,204,150,0.3)")]:
+                    fig_fan.add_trace(go.Scatter(x=fan.index, y=fan[low], mode='lines', line=dict(width=0), showlegend=False, hoverinfo='skip'))
+                    fig_fan.add_trace(go.Scatter(
+                        x=fan.index,
+                        y=fan[high],
+                        mode='lines',
+                        line=dict(width=0),
+                        fill='tonexty',
+                        fillcolor=color,
+                        name=f"{low[1:]}-{high[1:]}th percentile"
+                    ))
+                fig_fan.add_trace(go.Scatter(x=fan.index, y=fan["P50"], mode='lines', name='Median', line=dict(color='#00CC96')))
+                fig_fan.update_layout(
+                    title=f"Projected Portfolio Value ({cs})",
+                    xaxis_title="Date",
+                    yaxis_title=f"Value ({cs})",
+                    hovermode="x unified",
+                    height=400,
+                    margin=dict(l=0, r=0, t=30, b=0)
+                )
+                st.plotly_chart(fig_fan, config={'responsive': True})
+                
+                final = fan.iloc[-1]
+                m1, m2, m3 = st.columns(3)
+                m1.metric("Pessimistic (5th)", f"{cs} {final['P5']:,.0f}")
+                m2.metric("Median", f"{cs} {final['P50']:,.0f}")
+                m3.metric("Optimistic (95th)", f"{cs} {final['P95']:,.0f}")
+            except Exception as e:
+                st.error(f"Error running projection: {e}")
+
+        st.divider()
+
+        # Rebalancing
+        st.subheader("⚖️ Rebalance")
+        
+        try:
+            # Holdings plus watchlist ETFs as candidates
+            rebalance_tickers = port_df['Ticker'].unique().tolist()
+            for t in st.session_state["watchlist"]:
+                if t not in rebalance_tickers:
+                    rebalance_tickers.append(t)
+            
+            c1, c2, c3 = st.columns(3)
+            with c1:
+                objective = st.selectbox(
+                    "Objective",
+                    options=["target", "risk_parity", "min_variance", "mean_variance"],
+                    format_func=lambda x: {
+                        "target": "Target Weights",
+                        "risk_parity": "Risk Parity",
+                        "min_variance": "Minimum Variance",
+                        "mean_variance": "Mean-Variance"
+                    }[x]
+                )
+            with c2:
+                rebalance_cash = st.number_input(f"Cash to Invest ({cs})", min_value=0.0, value=0.0, step=100.0)
+            with c3:
+                risk_aversion = st.slider("Risk Aversion", min_value=0.5, max_value=20.0, value=3.0, step=0.5,
+                                          disabled=objective != "mean_variance")
+            
+            # Covariance is estimated once per ticker set and only fed the bars it hasn't seen
+            rebalance_start = pd.Timestamp.now().normalize() - pd.DateOffset(years=3)
+            rebalance_history = finance.get_total_return_prices(rebalance_tickers, rebalance_start)
+            rebalance_tickers = [t for t in rebalance_tickers if t in rebalance_history.columns]
+            # Watchlist candidates are quoted in their own currency; prices, cash and trades are in the base currency
+            rebalance_rates = fx.get_ticker_rates(rebalance_tickers, base_currency, rebalance_start)
+            rebalance_history = fx.convert_panel(rebalance_history, rebalance_rates)
+            if rebalance_history.empty:
+                st.warning("Historical data not available.")
+            else:
+                cov_key = (tuple(rebalance_tickers), base_currency)
+                if st.session_state.get("rebalance_cov_key") != cov_key:
+                    st.session_state["rebalance_cov"] = rebalance.CovarianceEstimator(rebalance_tickers)
+                    st.session_state["rebalance_cov_key"] = cov_key
+                estimator = st.session_state["rebalance_cov"]
+                estimator.update(risk.daily_returns(rebalance_history))
+            
+                # Shares carried across splits, to match today's post-split prices
+                held_qty = portfolio.held_shares(port_df)
+                rebalance_prices = rebalance_history.ffill().iloc[-1]
+                live_prices = pd.Series(current_prices, dtype=float)
+                live_prices = live_prices[live_prices > 0]
+                rebalance_prices.loc[live_prices.index.intersection(rebalance_prices.index)] = live_prices
+            
+                if objective == "target":
+                    # Start from the current weights; the user edits them in the table
+                    current_values = (held_qty.reindex(rebalance_tickers).fillna(0) * rebalance_prices.reindex(rebalance_tickers)).fillna(0)
+                    default_weights = current_values / current_values.sum() * 100 if current_values.sum() else current_values
+                    edited = st.data_editor(
+                        pd.DataFrame({'Ticker': rebalance_tickers, 'Target Weight %': default_weights.values}),
+                        hide_index=True,
+                        disabled=['Ticker'],
+                        column_config={
+                            "Target Weight %": st.column_config.NumberColumn("Target Weight %", min_value=0.0, max_value=100.0, step=1.0, format="%.1f%%")
+                        },
+                        key="rebalance_weights"
+                    )
+                    target_weights = edited.set_index('Ticker')['Target Weight %']
+                else:
+                    cov = estimator.covariance()
+                    if objective == "risk_parity":
+                        solved = rebalance.risk_parity_weights(cov.values)
+                    elif objective == "min_variance":
+                        solved = rebalance.mean_variance_weights([0.0] * len(rebalance_tickers), cov.values, risk_aversion=1.0)
+                    else:
+                        solved = rebalance.mean_variance_weights(estimator.mean().values, cov.values, risk_aversion=risk_aversion)
+                    target_weights = pd.Series(solved, index=rebalance_tickers)
+            
+                trades, cash_left = rebalance.compute_trades(held_qty, rebalance_prices, target_weights, cash=rebalance_cash)
+                trades = trades[trades['Ticker'].isin(rebalance_tickers)]
+                trades.insert(0, 'Name', trades['Ticker'].map(ticker_names).fillna(trades['Ticker']))
+            
+                st.dataframe(
+                    trades,
+                    width='stretch',
+                    hide_index=True,
+                    column_config={
+                        "Current Value": st.column_config.NumberColumn("Current Value", format=f"{cs} %.2f"),
+                        "Current Weight %": st.column_config.NumberColumn("Current Weight %", format="%.1f%%"),
+                        "Target Weight %": st.column_config.NumberColumn("Target Weight %", format="%.1f%%"),
+                        "Target Value": st.column_config.NumberColumn("Target Value", format=f"{cs} %.2f"),
+                        "Trade Quantity": st.column_config.NumberColumn("Trade Quantity", format="%.4f"),
+                        "Trade Value": st.column_config.NumberColumn("Trade Value", format=f"{cs} %.2f"),
+                    }
+                )
+                st.caption(f"Cash left after trades: {cs} {cash_left:,.2f}")
+        except Exception as e:
+            st.error(f"Error computing rebalance: {e}")
     else:
         st.info("No transactions recorded.")
 
+def build_candlestick(hist):
+    fig = go.Figure()
+    fig.add_trace(go.Candlestick(
+        x=hist.index,
+        open=hist['Open'],
+        high=hist['High'],
+        low=hist['Low'],
+        close=hist['Close'],
+        name='Price'
+    ))
+    fig.update_layout(
+        height=300, 
+        margin=dict(l=0, r=0, t=0, b=0),
+        xaxis_rangeslider_visible=False
+    )
+    return fig
+
+def render_etf_card(data, change_period, quote=None, fig=None):
+    """Renders metrics and chart of one ETF, optionally overlaid with a live quote."""
+    current_price = data['current_price']
+    change = data['change']
+    pct_change = data['pct_change']
+    hist = data['history']
+    
+    if quote is not None:
+        # Keep the same reference price the change period was computed from
+        reference_price = data['current_price'] - data['change']
+        current_price = quote['price']
+        change = current_price - reference_price
+        pct_change = (change / reference_price) * 100 if reference_price else 0
+        if fig is None:
+            hist = live.apply_quote(hist, quote)
+    
+    # Header with metrics
+    c1, c2 = st.columns([1, 1])
+    with c1:
+        st.caption(f"Current price: {data['currency']} {current_price:.2f}")
+        if quote is not None:
+            st.caption(f"Last quote: {pd.Timestamp(quote['time']).strftime('%H:%M:%S')}")
+    with c2:
+        period_label = {
+            "1d": "Daily",
+            "1mo": "Monthly",
+            "3mo": "Quarterly",
+            "6mo": "Semi-Annual",
+            "1y": "Annual"
+        }.get(change_period, "Change")
+        
+        st.metric(
+            label=f"{period_label} Change",
+            value=f"{change:.2f}",
+            delta=f"{pct_change:.2f}%"
+        )
+    
+    # Chart
+    if not hist.empty:
+        st.plotly_chart(fig if fig is not None else build_candlestick(hist), config={'responsive': True})
+    else:
+        st.warning("Historical data not available.")
+
+def render_live_etf_card(data, change_period):
+    """Fragment body for live mode: only rebuilds the chart when the quote version changed."""
+    version, quote = live.get_poller().get(data['symbol'])
+    
+    cache = st.session_state.setdefault("live_charts", {})
+    key = (data['symbol'], len(data['history']), change_period)
+    cached = cache.get(key)
+    if cached is None or cached[0] != version:
+        hist = live.apply_quote(data['history'], quote)
+        cached = (version, build_candlestick(hist) if not hist.empty else None)
+        cache[key] = cached
+    
+    render_etf_card(data, change_period, quote=quote, fig=cached[1])
+
 # --- TAB 2: DASHBOARD ---
 with tab2:
     if not st.session_state["watchlist"]:
         st.info("Add ETFs to the watchlist from the sidebar to see data.")
     else:
-        # Time range controls
-        col_change, col_chart = st.columns(2)
-        with col_change:
-            change_period = st.selectbox(
-                "% Change",
-                options=["1d", "1mo", "3mo", "6mo", "1y"],
-                format_func=lambda x: {
-                    "1d": "Daily",
-                    "1mo": "Monthly",
-                    "3mo": "Quarterly",
-                    "6mo": "Semi-Annual",
-                    "1y": "Annual"
-                }[x],
-                index=0
-            )
-        with col_chart:
-            chart_period = st.selectbox(
-                "Chart Period",
-                options=["1mo", "3mo", "6mo", "1y", "2y", "5y", "max"],
-                format_func=lambda x: {
-                    "1mo": "1 Month",
-                    "3mo": "3 Months",
-                    "6mo": "6 Months",
-                    "1y": "1 Year",
-                    "2y": "2 Years",
-                    "5y": "5 Years",
-                    "max": "Max"
-                }[x],
-                index=3  # Default to 1y
-            )
-        
-        st.divider()
-        
-        # Fetch data for all tickers in watchlist
-        # We re-fetch here for the dashboard visualization
+        dashboard_view = st.radio(
+            "View",
+            options=["screener", "details"],
+            format_func=lambda x: {"screener": "📋 Screener", "details": "📈 Details"}[x],
+            horizontal=True,
+            label_visibility="collapsed"
+        )
         
-        for ticker in st.session_state["watchlist"]:
-            data = finance.get_etf_data(ticker, period=chart_period, change_period=change_period)
+        if dashboard_view == "screener":
+            # One batched history download and one table for the whole watchlist
+            # (1 year of returns plus the 200-day moving average)
+            screener_start = pd.Timestamp.now().normalize() - pd.Timedelta(days=400)
+            screener_history = finance.get_total_return_prices(st.session_state["watchlist"], screener_start)
+            screener_table = screener.screen(screener_history)
             
-            if data:
-                # Update watchlist if symbol changed (e.g. SXR8 -> SXR8.DE)
-                if data['symbol'] != ticker:
-                    idx = st.session_state["watchlist"].index(ticker)
-                    st.session_state["watchlist"][idx] = data['symbol']
-                    st.rerun()
+            if screener_table.empty:
+                st.warning("Historical data not available.")
+            else:
+                percent = lambda label: st.column_config.NumberColumn(label, format="%.2f%%")
+                st.dataframe(
+                    screener_table,
+                    width='stretch',
+                    hide_index=True,
+                    column_config={
+                        "Last Price": st.column_config.NumberColumn("Last Price", format="%.2f"),
+                        "1D %": percent("1D %"),
+                        "1M %": percent("1M %"),
+                        "3M %": percent("3M %"),
+                        "YTD %": percent("YTD %"),
+                        "1Y %": percent("1Y %"),
+                        "Volatility %": percent("Volatility %"),
+                        "From High %": st.column_config.NumberColumn("From High %", format="%.2f%%", help="Distance from the 1-year high"),
+                        "vs 200D MA %": st.column_config.NumberColumn("vs 200D MA %", format="%.2f%%", help="Distance from the 200-day moving average"),
+                    }
+                )
+        else:
+            # Time range controls
+            col_change, col_chart, col_live = st.columns(3)
+            with col_change:
+                change_period = st.selectbox(
+                    "% Change",
+                    options=["1d", "1mo", "3mo", "6mo", "1y"],
+                    format_func=lambda x: {
+                        "1d": "Daily",
+                        "1mo": "Monthly",
+                        "3mo": "Quarterly",
+                        "6mo": "Semi-Annual",
+                        "1y": "Annual"
+                    }[x],
+                    index=0
+                )
+            with col_chart:
+                chart_period = st.selectbox(
+                    "Chart Period",
+                    options=["1mo", "3mo", "6mo", "1y", "2y", "5y", "max"],
+                    format_func=lambda x: {
+                        "1mo": "1 Month",
+                        "3mo": "3 Months",
+                        "6mo": "6 Months",
+                        "1y": "1 Year",
+                        "2y": "2 Years",
+                        "5y": "5 Years",
+                        "max": "Max"
+                    }[x],
+                    index=3  # Default to 1y
+                )
+            with col_live:
+                live_mode = st.toggle("🔴 Live Prices", value=False, help="Poll intraday quotes and update only the ETFs whose price moved")
+                live_interval = st.number_input(
+                    "Refresh (seconds)",
+                    min_value=5,
+                    max_value=300,
+                    value=15,
+                    step=5,
+                    disabled=not live_mode
+                )
+            
+            st.divider()
+            
+            if live_mode:
+                # One poller per process pulls quotes for everyone; cards only read from it
+                poller = live.get_poller()
+                if st.secrets.get("LIVE_QUOTE_FEED", "") == "local" and not isinstance(poller.feed, live.LocalQuoteFeed):
+                    poller.feed = live.LocalQuoteFeed()
+                poller.interval = int(live_interval)
+                poller.watch(st.session_state["watchlist"])
+                poller.start()
+                live_card = st.fragment(run_every=int(live_interval))(render_live_etf_card)
+            
+            # Fetch data for all tickers in watchlist
+            # We re-fetch here for the dashboard visualization
+            
+            for ticker in st.session_state["watchlist"]:
+                data = finance.get_etf_data(ticker, period=chart_period, change_period=change_period)
                 
-                # Wrap in expander (collapsed by default)
-                with st.expander(f"📈 {data['name']} ({data['symbol']}) - {data['currency']} {data['current_price']:.2f}", expanded=False):
-                    # Header with metrics
-                    c1, c2 = st.columns([1, 1])
-                    with c1:
-                        st.caption(f"Current price: {data['currency']} {data['current_price']:.2f}")
-                    with c2:
-                        period_label = {
-                            "1d": "Daily",
-                            "1mo": "Monthly",
-                            "3mo": "Quarterly",
-                            "6mo": "Semi-Annual",
-                            "1y": "Annual"
-                        }.get(change_period, "Change")
-                        
-                        st.metric(
-                            label=f"{period_label} Change",
-                            value=f"{data['change']:.2f}",
-                            delta=f"{data['pct_change']:.2f}%"
-                        )
-                    
-                    # Chart
-                    hist = data['history']
-                    if not hist.empty:
-                        fig = go.Figure()
-                        fig.add_trace(go.Candlestick(
-                            x=hist.index,
-                            open=hist['Open'],
-                            high=hist['High'],
-                            low=hist['Low'],
-                            close=hist['Close'],
-                            name='Price'
-                        ))
-                        fig.update_layout(
-                            height=300, 
-                            margin=dict(l=0, r=0, t=0, b=0),
-                            xaxis_rangeslider_visible=False
-                        )
-                        st.plotly_chart(fig, config={'responsive': True})
+                if data:
+                    if live_mode:
+                        # Live cards rerun on their own; the label can't change without collapsing the expander
+                        with st.expander(f"📈 {data['name']} ({data['symbol']}) - 🔴 Live", expanded=False):
+                            live_card(data, change_period)
                     else:
-                        st.warning("Historical data not available.")
+                        # Wrap in expander (collapsed by default)
+                        with st.expander(f"📈 {data['name']} ({data['symbol']}) - {data['currency']} {data['current_price']:.2f}", expanded=False):
+                            render_etf_card(data, change_period)
+                else:
+                    st.error(f"Unable to fetch data for {ticker}")
+
+# --- TAB 3: RISK ---
+with tab3:
+    st.header("Risk Analytics")
+    
+    # All portfolio and watchlist tickers, portfolio first
+    risk_tickers = []
+    if not port_df.empty:
+        risk_tickers.extend(port_df['Ticker'].unique().tolist())
+    for t in st.session_state["watchlist"]:
+        if t not in risk_tickers:
+            risk_tickers.append(t)
+    
+    if not risk_tickers:
+        st.info("Add transactions or watchlist ETFs to see risk metrics.")
+    else:
+        c1, c2, c3, c4 = st.columns(4)
+        with c1:
+            benchmark = st.selectbox("Benchmark", options=risk_tickers, index=0)
+        with c2:
+            lookback = st.selectbox(
+                "Lookback",
+                options=[1, 3, 5, 10, 20],
+                format_func=lambda x: f"{x} Year" if x == 1 else f"{x} Years",
+                index=1
+            )
+        with c3:
+            rolling_window = st.number_input("Rolling Window (days)", min_value=5, max_value=252, value=21, step=1)
+        with c4:
+            risk_free_pct = st.number_input("Risk-Free Rate %", min_value=0.0, max_value=20.0, value=0.0, step=0.25)
+        
+        try:
+            risk_start = pd.Timestamp.now().normalize() - pd.DateOffset(years=lookback)
+            risk_history = finance.get_total_return_prices(risk_tickers, risk_start)
+            
+            if risk_history.empty:
+                st.warning("Historical data not available.")
             else:
-                st.error(f"Unable to fetch data for {ticker}")
+                summary = risk.risk_summary(risk_history, benchmark=benchmark, risk_free_rate=risk_free_pct / 100)
+                
+                # Current rolling volatility is kept in session and only fed the bars it hasn't seen
+                rolling_key = (tuple(risk_history.columns), int(rolling_window))
+                if st.session_state.get("risk_rolling_key") != rolling_key:
+                    st.session_state["risk_rolling"] = risk.RollingStats(risk_history.columns, window=int(rolling_window))
+                    st.session_state["risk_rolling_key"] = rolling_key
+                rolling_stats = st.session_state["risk_rolling"]
+                rolling_stats.extend(risk.daily_returns(risk_history))
+                summary['Current Volatility %'] = summary['Ticker'].map(rolling_stats.volatility() * 100)
+                
+                st.dataframe(
+                    summary,
+                    width='stretch',
+                    hide_index=True,
+                    column_config={
+                        "Volatility %": st.column_config.NumberColumn("Volatility %", format="%.2f%%"),
+                        "Current Volatility %": st.column_config.NumberColumn(
+                            "Current Volatility %",
+                            format="%.2f%%",
+                            help="Annualized volatility over the rolling window"
+                        ),
+                        "Max Drawdown %": st.column_config.NumberColumn("Max Drawdown %", format="%.2f%%"),
+                        "Sharpe": st.column_config.NumberColumn("Sharpe", format="%.2f"),
+                        "Sortino": st.column_config.NumberColumn("Sortino", format="%.2f"),
+                        "Beta": st.column_config.NumberColumn("Beta", format="%.2f"),
+                    }
+                )
+                
+                # Rolling volatility chart
+                st.subheader("📉 Rolling Volatility")
+                vol = risk.rolling_volatility(risk_history, window=int(rolling_window)) * 100
+                fig_vol = go.Figure()
+                for column in vol.columns:
+                    fig_vol.add_trace(go.Scatter(
+                        x=vol.index,
+                        y=vol[column],
+                        mode='lines',
+                        name=column,
+                        hovertemplate='%{y:.2f}%<extra></extra>'
+                    ))
+                fig_vol.update_layout(
+                    title="Annualized Rolling Volatility (%)",
+                    xaxis_title="Date",
+                    yaxis_title="Volatility (%)",
+                    hovermode="x unified",
+                    height=400,
+                    margin=dict(l=0, r=0, t=30, b=0)
+                )
+                st.plotly_chart(fig_vol, config={'responsive': True})
+                
+                # Correlation heatmap
+                st.subheader("🔗 Correlation Matrix")
+                corr = risk.correlation_matrix(risk_history)
+                if not corr.empty:
+                    fig_corr = go.Figure(go.Heatmap(
+                        z=corr.values,
+                        x=corr.columns,
+                        y=corr.index,
+                        zmin=-1,
+                        zmax=1,
+                        colorscale='RdBu',
+                        text=corr.round(2).values,
+                        texttemplate='%{text}'
+                    ))
+                    fig_corr.update_layout(height=500, margin=dict(l=0, r=0, t=30, b=0))
+                    st.plotly_chart(fig_corr, config={'responsive': True})
+        
+        except Exception as e:
+            st.error(f"Error calculating risk metrics: {e}")
+
+# --- TAB 4: ALERTS ---
+with tab4:
+    st.header("Price Alerts")
+    
+    # The engine was started with the process (see above) and keeps running after this page is closed
+    engine = alerts.get_engine(st.secrets.get("ALERT_WEBHOOK_URL", ""))
+    alert_rules = alerts.load_rules()
+    if not alert_rules.empty:
+        engine.start()
+    
+    # Portfolio and watchlist symbols, portfolio first
+    alert_symbols = []
+    if not port_df.empty:
+        alert_symbols.extend(port_df['Ticker'].unique().tolist())
+    for t in st.session_state["watchlist"]:
+        if t not in alert_symbols:
+            alert_symbols.append(t)
+    
+    if not alert_symbols:
+        st.info("Add transactions or watchlist ETFs to set alerts.")
+    else:
+        with st.form("alert_form"):
+            c1, c2, c3, c4 = st.columns(4)
+            with c1:
+                a_symbol = st.selectbox("Symbol", options=alert_symbols)
+            with c2:
+                a_kind = st.selectbox("Condition", options=list(alerts.KINDS), format_func=alerts.KINDS.get)
+            with c3:
+                a_threshold = st.number_input("Price / Move %", min_value=0.0, value=0.0, step=0.5)
+            with c4:
+                a_window = st.number_input("MA Window (days)", min_value=5, max_value=400, value=50, step=5)
+            
+            if st.form_submit_button("Add Alert"):
+                rule = alerts.new_rule(a_symbol, a_kind, a_threshold, a_window)
+                alert_rules = pd.concat([alert_rules, pd.DataFrame([rule])], ignore_index=True)
+                alerts.save_rules(alert_rules)
+                engine.start()
+                st.success(f"✅ Alert added for {a_symbol}")
+    
+    if not alert_rules.empty:
+        st.subheader("Rules")
+        edited_rules = st.data_editor(
+            alert_rules,
+            width='stretch',
+            hide_index=True,
+            num_rows="dynamic",
+            disabled=["id"],
+            column_config={
+                "symbol": st.column_config.SelectboxColumn("Symbol", options=alert_symbols or None),
+                "kind": st.column_config.SelectboxColumn("Condition", options=list(alerts.KINDS)),
+                "threshold": st.column_config.NumberColumn("Price / Move %", format="%.2f"),
+                "window": st.column_config.NumberColumn("MA Window", format="%d"),
+            },
+            key="alert_rules_editor"
+        )
+        
+        c1, c2 = st.columns(2)
+        with c1:
+            if st.button("💾 Save Rules"):
+                edited_rules = edited_rules.dropna(subset=['symbol', 'kind'])
+                # Rows added in the editor have no id yet
+                missing_id = edited_rules['id'].isna()
+                edited_rules.loc[missing_id, 'id'] = [alerts.new_rule(r.symbol, r.kind)['id'] for r in edited_rules[missing_id].itertuples()]
+                edited_rules['threshold'] = edited_rules['threshold'].fillna(0.0)
+                edited_rules['window'] = edited_rules['window'].fillna(50).astype(int)
+                alerts.save_rules(edited_rules)
+                st.rerun()
+        with c2:
+            if st.button("🔄 Check Now"):
+                fired = engine.tick()
+                if not fired:
+                    st.info("No new alerts.")
+    
+    st.subheader("Recent Alerts")
+    if engine.events:
+        recent = pd.DataFrame(list(engine.events))[['time', 'symbol', 'message']].iloc[::-1]
+        st.dataframe(recent, width='stretch', hide_index=True)
+    else:
+        st.caption("No alerts fired since the app started.")
@@ -0,0 +1,137 @@
+"""
+Headless batch reports for many portfolios.
+
+Loads every portfolio (CSV files in the portfolio.csv format and/or Google Sheet IDs),
+downloads one shared price panel for all their tickers, then computes performance and
+historical gain/loss for each portfolio in a process pool.
+
+Usage:
+    python report.py accounts/*.csv --sheet 1AbC... --output reports --format parquet
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from utils import finance, fx, portfolio
+
+# Set once per worker process by _init_worker, so the panel is only sent to each worker once
+_panel = None
+_current_prices = None
+_fx_rates = None
+_corporate_actions = None
+
+def _init_worker(panel, current_prices, fx_rates, corporate_actions):
+    global _panel, _current_prices, _fx_rates, _corporate_actions
+    _panel = panel
+    _current_prices = current_prices
+    _fx_rates = fx_rates
+    _corporate_actions = corporate_actions
+
+def _report_one(name, portfolio_df):
+    """Computes both reports for one portfolio using the worker's shared panel."""
+    tickers = [t for t in portfolio_df['Ticker'].unique() if t in _panel.columns]
+    history = _panel[tickers]
+    fx_rates = _fx_rates.reindex(columns=tickers)
+    corporate_actions = {kind: events.reindex(columns=tickers) for kind, events in _corporate_actions.items()}
+
+    perf = portfolio.calculate_performance(portfolio_df, _current_prices, history, fx_rates, corporate_actions)
+    hist = portfolio.calculate_historical_performance(portfolio_df, history, fx_rates, corporate_actions)
+
+    if not perf.empty:
+        perf.insert(0, 'Portfolio', name)
+    if not hist.empty:
+        hist = hist.reset_index()
+        hist.insert(0, 'Portfolio', name)
+    return name, perf, hist
+
+def load_portfolios(paths, sheet_ids):
+    """Returns {name: DataFrame} for every non-empty portfolio."""
+    portfolios = {}
+    for path in paths:
+        df = portfolio.load_portfolio_file(path)
+        name = os.path.splitext(os.path.basename(path))[0]
+        if df.empty:
+            print(f"Skipping {path}: empty or not in portfolio format")
+            continue
+        portfolios[name] = df
+    for sheet_id in sheet_ids:
+        df = portfolio.load_portfolio_sheet(sheet_id)
+        if df.empty:
+            print(f"Skipping sheet {sheet_id}: empty or not in portfolio format")
+            continue
+        portfolios[sheet_id] = df
+    return portfolios
+
+def load_panel(portfolios, base_currency):
+    """
+    Downloads one price panel covering all tickers since the earliest purchase,
+    plus the rates converting each ticker into the base currency and its dividends and splits.
+    """
+    all_tx = pd.concat(portfolios.values(), ignore_index=True)
+    tickers = all_tx['Ticker'].unique().tolist()
+    first_purchase_date = pd.to_datetime(all_tx['Date']).min()
+
+    panel = finance.get_historical_prices(tickers, first_purchase_date)
+    # Latest close stands in for the live price in headless runs
+    current_prices = panel.ffill().iloc[-1].dropna().to_dict() if not panel.empty else {}
+    fx_rates = fx.get_ticker_rates(tickers, base_currency, first_purchase_date)
+    corporate_actions = finance.get_corporate_actions(tickers)
+    return panel, current_prices, fx_rates, corporate_actions
+
+def write_table(df, output_dir, name, fmt):
+    path = os.path.join(output_dir, f"{name}.{fmt}")
+    if fmt == "parquet":
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+    print(f"Wrote {len(df)} rows to {path}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compute portfolio reports without the Streamlit UI.")
+    parser.add_argument("csv", nargs="*", help="Portfolio CSV files (portfolio.csv format)")
+    parser.add_argument("--sheet", action="append", default=[], help="Google Sheet ID (repeatable)")
+    parser.add_argument("--output", default="reports", help="Output directory (default: reports)")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv", help="Output format (parquet needs pyarrow)")
+    parser.add_argument("--currency", default="EUR", help="Base currency for values (default: EUR)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    args = parser.parse_args(argv)
+
+    portfolios = load_portfolios(args.csv, args.sheet)
+    if not portfolios:
+        print("No portfolios to report on.")
+        return 1
+
+    panel, current_prices, fx_rates, corporate_actions = load_panel(portfolios, args.currency.upper())
+    if panel.empty:
+        print("Could not load any price history.")
+        return 1
+    print(f"Loaded {len(panel.columns)} tickers x {len(panel)} days for {len(portfolios)} portfolios")
+
+    performance = []
+    history = []
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                             initargs=(panel, current_prices, fx_rates, corporate_actions)) as pool:
+        futures = {pool.submit(_report_one, name, df): name for name, df in portfolios.items()}
+        for future in as_completed(futures):
+            try:
+                name, perf, hist = future.result()
+            except Exception as e:
+                print(f"Error computing report for {futures[future]}: {e}")
+                continue
+            performance.append(perf)
+            history.append(hist)
+
+    os.makedirs(args.output, exist_ok=True)
+    performance = [df for df in performance if not df.empty]
+    history = [df for df in history if not df.empty]
+    if performance:
+        write_table(pd.concat(performance, ignore_index=True), args.output, "performance", args.format)
+    if history:
+        write_table(pd.concat(history, ignore_index=True), args.output, "history", args.format)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+from utils import portfolio
+
+def _weekend_purchase():
+    """10 units bought on a Saturday, before the first day of the price panel."""
+    days = pd.bdate_range("2024-01-08", periods=5)
+    prices = pd.DataFrame({'SXR8': [100.0, 100.0, 100.0, 100.0, 109.5]}, index=days)
+    port_df = pd.DataFrame({
+        'Date': [pd.Timestamp("2024-01-06")],
+        'ISIN': ['IE00B5BMR087'],
+        'Ticker': ['SXR8'],
+        'Price': [100.0],
+        'Quantity': [10.0],
+    })
+    return port_df, prices
+
+def test_events_before_the_panel_are_ignored():
+    """Dividends and splits dated before the panel are already in its prices."""
+    port_df, prices = _weekend_purchase()
+    corporate_actions = {
+        'Dividends': pd.DataFrame({'SXR8': [1.5, 1.2]}, index=pd.to_datetime(["2019-06-03", "2023-06-01"])),
+        'Stock Splits': pd.DataFrame({'SXR8': [2.0]}, index=pd.to_datetime(["2021-03-15"])),
+    }
+
+    adjusted, _ = portfolio.apply_corporate_actions(port_df, prices, corporate_actions)
+    assert adjusted['Units'].iloc[0] == 10.0
+
+    perf = portfolio.calculate_performance(port_df, {'SXR8': 109.5}, prices, corporate_actions=corporate_actions)
+    assert round(perf.iloc[0]['Gain/Loss %'], 1) == 9.5
+
+def test_events_after_the_purchase_adjust_units():
+    """A split doubles the units and shares; a dividend is reinvested into units only."""
+    port_df, prices = _weekend_purchase()
+    corporate_actions = {
+        'Dividends': pd.DataFrame({'SXR8': [1.0]}, index=pd.to_datetime(["2024-01-09"])),
+        'Stock Splits': pd.DataFrame({'SXR8': [2.0]}, index=pd.to_datetime(["2024-01-10"])),
+    }
+
+    adjusted, _ = portfolio.apply_corporate_actions(port_df, prices, corporate_actions)
+    assert abs(adjusted['Units'].iloc[0] - 10.0 * 2.0 * 1.01) < 1e-9
+    assert adjusted['Quantity'].iloc[0] == 10.0
+    # Shares held today (for trading at post-split prices) follow the split only
+    assert portfolio.held_shares(adjusted).to_dict() == {'SXR8': 20.0}
+
+if __name__ == "__main__":
+    test_events_before_the_panel_are_ignored()
+    test_events_after_the_purchase_adjust_units()
+    print("Corporate actions: OK")
@@ -0,0 +1,46 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+from utils import portfolio
+
+def test_reimport_same_file_adds_nothing():
+    """Re-importing the same broker export must not duplicate rows (int vs float quantities)."""
+    with tempfile.TemporaryDirectory() as tmp:
+        original_file = portfolio.PORTFOLIO_FILE
+        original_client = portfolio.get_gsheets_client
+        portfolio.PORTFOLIO_FILE = os.path.join(tmp, "portfolio.csv")
+        # Never touch a Google Sheet configured in .streamlit/secrets.toml
+        portfolio.get_gsheets_client = lambda: None
+        try:
+            portfolio.add_transaction("2024-01-02", "IE00B5BMR087", "SXR8", 450, 2)
+
+            raw = pd.DataFrame({
+                'Date': ['2024-01-02', '2024-02-01'],
+                'ISIN': ['IE00B5BMR087', 'IE00B4L5Y983'],
+                'Ticker': ['SXR8', 'SWDA'],
+                'Price': ['450', '80.5'],
+                'Quantity': ['2', '3'],
+            })
+
+            existing = portfolio.load_portfolio_file(portfolio.PORTFOLIO_FILE)
+            first = portfolio.import_transactions(raw, existing_df=existing)
+            assert len(first['imported']) == 1
+            assert first['duplicates'] == 1
+
+            existing = portfolio.load_portfolio_file(portfolio.PORTFOLIO_FILE)
+            second = portfolio.import_transactions(raw, existing_df=existing)
+            assert len(second['imported']) == 0
+            assert second['duplicates'] == 2
+
+            assert len(portfolio.load_portfolio_file(portfolio.PORTFOLIO_FILE)) == 2
+        finally:
+            portfolio.PORTFOLIO_FILE = original_file
+            portfolio.get_gsheets_client = original_client
+
+if __name__ == "__main__":
+    test_reimport_same_file_adds_nothing()
+    print("Re-import adds no duplicates: OK")
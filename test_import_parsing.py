@@ -0,0 +1,42 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+from utils import portfolio
+
+def test_ambiguous_thousands_are_not_guessed():
+    """1,000 alone is rejected; elsewhere in the column the export's convention decides."""
+    raw = pd.DataFrame({
+        'Date': ['2024-01-02'],
+        'Ticker': ['SXR8'],
+        'Price': ['450'],
+        'Quantity': ['1,000'],
+    })
+    valid, rejected = portfolio.normalize_transactions(raw)
+    assert valid.empty
+    assert rejected['Error'].tolist() == ['Invalid quantity']
+
+    english = portfolio._parse_numbers(pd.Series(['1,000', '2.5']))
+    assert english.tolist() == [1000.0, 2.5]
+
+    european = portfolio._parse_numbers(pd.Series(['1,000', '1.234,5']))
+    assert european.tolist() == [1.0, 1234.5]
+
+def test_invalid_iso_date_is_rejected():
+    """2024-13-01 must not be read day-first as 13 January."""
+    raw = pd.DataFrame({
+        'Date': ['2024-13-01', '31/01/2024'],
+        'Ticker': ['SXR8', 'SXR8'],
+        'Price': ['450', '451'],
+        'Quantity': ['2', '3'],
+    })
+    valid, rejected = portfolio.normalize_transactions(raw)
+    assert valid['Date'].tolist() == ['2024-01-31']
+    assert rejected['Error'].tolist() == ['Invalid date']
+
+if __name__ == "__main__":
+    test_ambiguous_thousands_are_not_guessed()
+    test_invalid_iso_date_is_rejected()
+    print("Import parsing: OK")
@@ -0,0 +1,160 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+ACTION_COLS = ['Dividends', 'Stock Splits']
+
+class ActionStore:
+    """
+    Process-wide cache of dividends and splits per resolved symbol, kept next to the
+    price store. The full event history is fetched once per symbol; afterwards only
+    the days since the last check are asked for, at most every `refresh_seconds`.
+    A failed fetch is retried after `retry_seconds`, not on every call.
+    """
+
+    def __init__(self, refresh_seconds=3600 * 12, retry_seconds=900):
+        self.refresh_seconds = refresh_seconds
+        self.retry_seconds = retry_seconds
+        self.version = 0
+
+        self._lock = threading.RLock()
+        self._events = {}      # symbol -> DataFrame (index=Date, columns=ACTION_COLS), non-zero rows only
+        self._checked_at = {}  # symbol -> (time.time(), last day covered)
+        self._failed_at = {}   # symbol -> time.time() of the last failed fetch
+
+    def _fetch_all(self, symbol):
+        import yfinance as yf
+
+        return _clean_events(yf.Ticker(symbol).actions)
+
+    def _fetch_since(self, symbol, start):
+        import yfinance as yf
+
+        return _clean_events(yf.Ticker(symbol).history(start=start, actions=True))
+
+    def _is_due(self, symbol, now):
+        failed = self._failed_at.get(symbol)
+        if failed is not None and now - failed < self.retry_seconds:
+            return False
+        checked = self._checked_at.get(symbol)
+        return checked is None or now - checked[0] > self.refresh_seconds
+
+    def _update(self, symbol):
+        """Fetches the events of one symbol (all of them, or only the new ones). Runs in a worker thread."""
+        checked = self._checked_at.get(symbol)
+        try:
+            if checked is None:
+                events = self._fetch_all(symbol)
+            else:
+                events = self._fetch_since(symbol, checked[1])
+        except Exception as e:
+            print(f"Error fetching corporate actions for {symbol}: {e}")
+            return symbol, None
+        return symbol, events
+
+    def get_actions(self, symbols):
+        """
+        Returns {'Dividends': DataFrame, 'Stock Splits': DataFrame} with one column per
+        symbol and one row per event date (0 where a symbol has no event that day).
+        """
+        symbols = list(dict.fromkeys(symbols))
+        with self._lock:
+            now = time.time()
+            due = [s for s in symbols if self._is_due(s, now)]
+            if due:
+                with ThreadPoolExecutor(max_workers=min(8, len(due))) as pool:
+                    results = list(pool.map(self._update, due))
+                today = pd.Timestamp.now().normalize()
+                for symbol, events in results:
+                    if events is None:
+                        self._failed_at[symbol] = now
+                        continue
+                    self._failed_at.pop(symbol, None)
+                    previous = self._events.get(symbol)
+                    if previous is not None and not previous.empty:
+                        events = events.combine_first(previous)
+                    self._events[symbol] = events.sort_index()
+                    self._checked_at[symbol] = (now, today)
+                self.version += 1
+
+            panels = {}
+            for col in ACTION_COLS:
+                columns = {s: self._events[s][col] for s in symbols if s in self._events}
+                panel = pd.DataFrame(columns).reindex(columns=symbols) if columns else pd.DataFrame(columns=symbols)
+                panels[col] = panel.fillna(0.0)
+            return panels
+
+def _clean_events(df):
+    """Keeps the non-zero dividend/split rows with a tz-naive daily index."""
+    if df is None or df.empty:
+        return pd.DataFrame(columns=ACTION_COLS, dtype=float)
+    events = df.reindex(columns=ACTION_COLS).fillna(0.0).astype(float)
+    events = events[(events != 0).any(axis=1)]
+    events.index = pd.to_datetime(events.index)
+    if events.index.tz is not None:
+        events.index = events.index.tz_localize(None)
+    events.index = events.index.normalize()
+    return events.groupby(level=0).sum()
+
+_store = ActionStore()
+
+def get_store():
+    """Returns the corporate-actions store shared by the whole process."""
+    return _store
+
+def _scatter(events, days, columns):
+    """
+    Spreads sparse events (index=Date, columns=symbols) onto the panel days;
+    an event on a non-trading day lands on the next trading day, events before
+    the first day are dropped.
+    """
+    grid = np.zeros((len(days), len(columns)))
+    if events is None or events.empty:
+        return grid
+    events = events.reindex(columns=columns).fillna(0.0)
+    event_days = pd.DatetimeIndex(events.index)
+    rows = days.searchsorted(event_days, side='left')
+    values = events.to_numpy(dtype=float)
+    # Events before the panel are already in its prices; only later ones move the factors
+    keep = (rows < len(days)) & (event_days >= days[0])
+    np.add.at(grid, rows[keep], values[keep])
+    return grid
+
+def _panel_days(price_history_df):
+    days = pd.DatetimeIndex(price_history_df.index)
+    if days.tz is not None:
+        days = days.tz_localize(None)
+    return days.normalize()
+
+def adjustment_factors(price_history_df, corporate_actions):
+    """
+    Cumulative factors over the price panel, as (reinvest, split) arrays (days x columns):
+    reinvest: units held per starting unit when every dividend is reinvested at the
+              ex-date close, i.e. cumprod(1 + dividend / close)
+    split: cumulative product of split ratios up to each day
+    """
+    days = _panel_days(price_history_df)
+    columns = list(price_history_df.columns)
+    closes = price_history_df.ffill().to_numpy(dtype=float)
+
+    dividends = _scatter(corporate_actions.get('Dividends'), days, columns)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = np.where(closes > 0, 1 + dividends / closes, 1.0)
+    reinvest = np.cumprod(growth, axis=0)
+
+    ratios = corporate_actions.get('Stock Splits')
+    log_ratios = _scatter(np.log(ratios.where(ratios > 0, 1.0)) if ratios is not None else None, days, columns)
+    split = np.exp(np.cumsum(log_ratios, axis=0))
+    return reinvest, split
+
+def total_return(price_history_df, corporate_actions):
+    """
+    Total-return version of a close-price panel (dividends reinvested), scaled so the
+    last value equals the last close.
+    """
+    if price_history_df.empty:
+        return price_history_df
+    reinvest, _ = adjustment_factors(price_history_df, corporate_actions)
+    return price_history_df * (reinvest / reinvest[-1])
@@ -0,0 +1,244 @@
+import json
+import os
+import threading
+import uuid
+from collections import deque
+import numpy as np
+import pandas as pd
+
+ALERTS_FILE = "alerts.json"
+KINDS = {
+    'above': "Price above",
+    'below': "Price below",
+    'pct_move': "Daily move ≥ %",
+    'ma_cross': "Crosses N-day MA",
+}
+RULE_COLS = ['id', 'symbol', 'kind', 'threshold', 'window']
+
+def load_rules(path=ALERTS_FILE):
+    """Loads alert rules from a JSON file; empty rules if missing or invalid."""
+    if os.path.exists(path):
+        try:
+            with open(path) as f:
+                return pd.DataFrame(json.load(f), columns=RULE_COLS)
+        except Exception as e:
+            print(f"Error loading alerts from {path}: {e}")
+    return pd.DataFrame(columns=RULE_COLS)
+
+def save_rules(rules, path=ALERTS_FILE):
+    """Saves alert rules to a JSON file."""
+    with open(path, "w") as f:
+        json.dump(rules[RULE_COLS].to_dict(orient="records"), f, indent=2, default=float)
+
+def new_rule(symbol, kind, threshold=0.0, window=50):
+    if kind not in KINDS:
+        raise ValueError(f"Unknown alert kind: {kind}")
+    return {'id': uuid.uuid4().hex[:8], 'symbol': symbol, 'kind': kind,
+            'threshold': float(threshold), 'window': int(window)}
+
+def evaluate(rules, price_history_df, last_prices=None):
+    """
+    Evaluates every rule against a daily price panel at once.
+    Per-symbol features (last price, daily move, moving averages) are computed once per
+    symbol (and once per distinct MA window); rules only index into them.
+    last_prices: optional {symbol: price} overriding the last close (e.g. live quotes)
+    Returns (triggered boolean array aligned with rules, last price per rule).
+    """
+    n_rules = len(rules)
+    if n_rules == 0 or price_history_df.empty:
+        return np.zeros(n_rules, dtype=bool), np.full(n_rules, np.nan)
+
+    prices = price_history_df.ffill()
+    symbols = prices.columns
+    last = prices.iloc[-1].to_numpy(dtype=float)
+    if last_prices:
+        live = pd.Series(last_prices, dtype=float).reindex(symbols).to_numpy()
+        last = np.where(np.isnan(live), last, live)
+    prev = prices.iloc[-2].to_numpy(dtype=float) if len(prices) > 1 else np.full(len(symbols), np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        move_pct = (last / prev - 1) * 100
+
+    # Moving-average cross per distinct window: did price switch sides of its MA since yesterday?
+    windows = np.unique(rules.loc[rules['kind'] == 'ma_cross', 'window'].astype(int))
+    crossed = np.zeros((max(len(windows), 1), len(symbols)), dtype=bool)
+    values = prices.to_numpy(dtype=float)
+    for i, window in enumerate(windows):
+        if len(values) <= window:
+            continue
+        ma_now = values[-window:].mean(axis=0)
+        ma_prev = values[-window - 1:-1].mean(axis=0)
+        side_now = np.sign(last - ma_now)
+        side_prev = np.sign(prev - ma_prev)
+        crossed[i] = (side_now != side_prev) & (side_now != 0) & ~np.isnan(side_now) & ~np.isnan(side_prev)
+
+    # Gather per-rule inputs with index arrays
+    sym_idx = symbols.get_indexer(rules['symbol'])
+    known = sym_idx >= 0
+    sym_idx = np.where(known, sym_idx, 0)
+    kind = rules['kind'].to_numpy()
+    threshold = rules['threshold'].to_numpy(dtype=float)
+    win_idx = np.searchsorted(windows, rules['window'].astype(int).to_numpy()).clip(0, crossed.shape[0] - 1)
+
+    rule_last = last[sym_idx]
+    with np.errstate(invalid='ignore'):
+        triggered = np.select(
+            [kind == 'above', kind == 'below', kind == 'pct_move', kind == 'ma_cross'],
+            [rule_last >= threshold, rule_last <= threshold,
+             np.abs(move_pct[sym_idx]) >= threshold, crossed[win_idx, sym_idx]],
+            False
+        )
+    triggered = triggered & known
+    return triggered, np.where(known, rule_last, np.nan)
+
+class LogSink:
+    """Prints alerts to the server log."""
+
+    def send(self, events):
+        for event in events:
+            print(f"[alert] {event['message']}")
+
+class FileSink:
+    """Appends alerts to a JSON-lines file."""
+
+    def __init__(self, path="alerts_log.jsonl"):
+        self.path = path
+
+    def send(self, events):
+        with open(self.path, "a") as f:
+            for event in events:
+                f.write(json.dumps(event, default=str) + "\n")
+
+class WebhookSink:
+    """Posts alerts as one JSON payload to a webhook URL."""
+
+    def __init__(self, url, timeout=5):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, events):
+        import requests
+
+        requests.post(self.url, json={'alerts': events}, timeout=self.timeout).raise_for_status()
+
+class AlertEngine:
+    """
+    Evaluates all alert rules in a background thread every `interval` seconds
+    against the shared price cache, and notifies the sinks when a rule starts
+    matching (it fires again only after the condition has cleared).
+    """
+
+    def __init__(self, sinks=None, interval=300, rules_path=ALERTS_FILE, history_days=400):
+        self.sinks = sinks if sinks is not None else [LogSink()]
+        self.interval = interval
+        self.rules_path = rules_path
+        self.history_days = history_days
+        self.events = deque(maxlen=200)
+
+        self._lock = threading.Lock()
+        self._active = {}  # rule id -> condition at the last tick
+        self._stop = threading.Event()
+        self._thread = None
+
+    def tick(self, last_prices=None):
+        """Evaluates all rules once and returns the events that fired."""
+        from utils import finance
+
+        rules = load_rules(self.rules_path)
+        if rules.empty:
+            return []
+
+        start = pd.Timestamp.now().normalize() - pd.Timedelta(days=self.history_days)
+        history = finance.get_historical_prices(rules['symbol'].unique().tolist(), start)
+        triggered, rule_prices = evaluate(rules, history, last_prices)
+
+        now = pd.Timestamp.now()
+        events = []
+        with self._lock:
+            for rule, hit, price in zip(rules.to_dict(orient="records"), triggered, rule_prices):
+                was_active = self._active.get(rule['id'], False)
+                self._active[rule['id']] = bool(hit)
+                if hit and not was_active:
+                    events.append({
+                        'time': now,
+                        'rule': rule['id'],
+                        'symbol': rule['symbol'],
+                        'kind': rule['kind'],
+                        'threshold': rule['threshold'],
+                        'price': float(price),
+                        'message': _describe(rule, price)
+                    })
+            self.events.extend(events)
+
+        if events:
+            for sink in self.sinks:
+                try:
+                    sink.send(events)
+                except Exception as e:
+                    print(f"Error sending alerts to {type(sink).__name__}: {e}")
+        return events
+
+    def _live_prices(self):
+        """Latest quotes the live poller already holds, so intraday moves are seen without extra requests."""
+        from utils import live
+
+        poller = live.get_poller()
+        quotes = {}
+        for symbol in load_rules(self.rules_path)['symbol'].unique():
+            quote = poller.peek(symbol)[1]
+            if quote and quote.get('price') is not None:
+                quotes[symbol] = quote['price']
+        return quotes
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.tick(self._live_prices())
+            except Exception as e:
+                print(f"Error evaluating alerts: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """Starts the background thread if it isn't running."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="alert-engine", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+def _describe(rule, price):
+    symbol = rule['symbol']
+    if rule['kind'] == 'above':
+        return f"{symbol} at {price:.2f} is above {rule['threshold']:.2f}"
+    if rule['kind'] == 'below':
+        return f"{symbol} at {price:.2f} is below {rule['threshold']:.2f}"
+    if rule['kind'] == 'pct_move':
+        return f"{symbol} moved more than {rule['threshold']:.2f}% today ({price:.2f})"
+    return f"{symbol} at {price:.2f} crossed its {int(rule['window'])}-day moving average"
+
+_engine = AlertEngine()
+
+def get_engine(webhook_url=None):
+    """Returns the alert engine shared by the whole process, adding a webhook sink for webhook_url once."""
+    if webhook_url and not any(isinstance(s, WebhookSink) for s in _engine.sinks):
+        _engine.sinks.append(WebhookSink(webhook_url))
+    return _engine
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Evaluate price alerts without the Streamlit UI.")
+    parser.add_argument("--interval", type=int, default=300, help="Seconds between evaluations (default: 300)")
+    parser.add_argument("--log-file", default="alerts_log.jsonl", help="JSON-lines file for fired alerts")
+    parser.add_argument("--webhook", default=None, help="Webhook URL to post fired alerts to")
+    args = parser.parse_args()
+
+    sinks = [LogSink(), FileSink(args.log_file)]
+    if args.webhook:
+        sinks.append(WebhookSink(args.webhook))
+    engine = AlertEngine(sinks=sinks, interval=args.interval)
+    engine.start()
+    engine._thread.join()
@@ -1,13 +1,16 @@
-import requests
-import yfinance as yf
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 import pandas as pd
 import streamlit as st
+from utils import actions, prices
 
 def search_by_isin(isin):
     """
     Searches for a ticker by ISIN using Yahoo Finance auto-complete API.
     Returns a list of dictionaries with 'symbol', 'longname', 'exchange'.
     """
+    import requests
+    
     url = f"https://query2.finance.yahoo.com/v1/finance/search?q={isin}"
     headers = {
         'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
@@ -38,6 +41,8 @@ def get_etf_name(symbol):
     Fetches and caches the ETF name.
     Raises Exception if fetching fails, so Streamlit DOES NOT cache the failure.
     """
+    import yfinance as yf
+    
     try:
         ticker = yf.Ticker(symbol)
         # First try .info
@@ -59,150 +64,291 @@ def get_etf_name(symbol):
     # Raise error to prevent caching the failure.
     raise ValueError(f"Could not fetch name for {symbol}")
 
-def get_etf_data(ticker_symbol, period="1y", change_period="1d"):
+# Listings tried for a bare ticker, in order of preference
+SUFFIXES = ["", ".DE", ".MI", ".L", ".PA", ".AS"]
+PROBE_TIMEOUT = 10  # seconds
+
+_probe_pool = None
+
+def _get_probe_pool():
+    global _probe_pool
+    if _probe_pool is None:
+        _probe_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="symbol-probe")
+    return _probe_pool
+
+def _probe_listing(symbol):
+    """Lightweight quote for one candidate listing; None if Yahoo has no price for it."""
+    import yfinance as yf
+
+    try:
+        info = yf.Ticker(symbol).fast_info
+        price = info.last_price
+        if price is None or not price > 0:
+            return None
+    except Exception:
+        return None
+
+    def field(name):
+        try:
+            return getattr(info, name)
+        except Exception:
+            return None
+
+    return {
+        'symbol': symbol,
+        'price': float(price),
+        'currency': field('currency'),
+        'volume': float(field('ten_day_average_volume') or 0)
+    }
+
+def _listing_rank(listing, position, preferred_currency):
     """
-    Fetches current data and historical history for a given ticker.
+    Sort key for candidate listings (lower is better).
+    Without a preferred currency: exchange order (SUFFIXES) only, i.e. the first listing
+    that has a price, as tickers already stored have always resolved.
+    With one: quoted in that currency, then actually traded, then exchange order,
+    then higher average volume.
     """
-    suffixes_to_try = ["", ".DE", ".MI", ".L", ".PA", ".AS"]
-    
-    for suffix in suffixes_to_try:
-        current_symbol = f"{ticker_symbol}{suffix}"
+    if preferred_currency is None:
+        return (position,)
+    matches = (listing['currency'] or '').upper() == preferred_currency.upper()
+    return (not matches, listing['volume'] <= 0, position, -listing['volume'])
+
+def _best_possible_rank(position, preferred_currency):
+    """The best key a listing still being probed at `position` could get."""
+    if preferred_currency is None:
+        return (position,)
+    return (False, False, position, float('-inf'))
+
+@st.cache_data(ttl=3600*24) # Cache for 24 hours
+def resolve_listing(ticker_symbol, preferred_currency=None):
+    """
+    Resolves a raw ticker (e.g. SXR8) to the listing yfinance can price (e.g. SXR8.DE).
+    All candidate listings are probed concurrently and the best one is picked by
+    _listing_rank; probes that can no longer win are cancelled.
+    preferred_currency: rank the listings for a new ticker (e.g. the base currency).
+    Leave it None for stored tickers, so they keep the listing (and currency) their
+    trades were valued with.
+    Returns a dict with 'symbol', 'price', 'currency' and 'volume'.
+    Raises Exception if no listing works, so Streamlit DOES NOT cache the failure.
+    """
+    # Tickers that already carry an exchange suffix are only tried as is
+    if "." in ticker_symbol:
+        candidates = [ticker_symbol]
+    else:
+        candidates = [f"{ticker_symbol}{suffix}" for suffix in SUFFIXES]
+
+    pool = _get_probe_pool()
+    pending = {pool.submit(_probe_listing, symbol): position for position, symbol in enumerate(candidates)}
+    best = None
+    best_key = None
+    deadline = time.monotonic() + PROBE_TIMEOUT
+
+    while pending:
+        done, _ = wait(pending, timeout=max(0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+        if not done:
+            break
+        for future in done:
+            position = pending.pop(future)
+            listing = future.result()
+            if listing is None:
+                continue
+            key = _listing_rank(listing, position, preferred_currency)
+            if best_key is None or key < best_key:
+                best, best_key = listing, key
+
+        # Decided once no pending listing could rank better even in the best case
+        if best_key is not None and all(_best_possible_rank(p, preferred_currency) > best_key for p in pending.values()):
+            break
+
+    for future in pending:
+        future.cancel()
+
+    if best is None:
+        raise ValueError(f"Could not resolve symbol for {ticker_symbol}")
+    return best
+
+def resolve_symbol(ticker_symbol, preferred_currency=None):
+    """
+    Resolves a raw ticker (e.g. SXR8) to the listing yfinance can price (e.g. SXR8.DE).
+    preferred_currency: see resolve_listing.
+    Raises Exception if no listing works.
+    """
+    return resolve_listing(ticker_symbol, preferred_currency)['symbol']
+
+def get_currencies(tickers):
+    """
+    Quote currency of each ticker's resolved listing, as cached with the resolution.
+    Returns {ticker: currency}; tickers that cannot be resolved are left out.
+    """
+    currencies = {}
+    for ticker_symbol in tickers:
         try:
-            ticker = yf.Ticker(current_symbol)
-            
-            # Try to get info/price to verify validity
-            try:
-                info = ticker.fast_info
-                current_price = info.last_price
-                if current_price is None:
-                    raise ValueError("No price data")
-            except:
-                hist_check = ticker.history(period="1d")
-                if hist_check.empty:
-                    continue 
-                current_price = hist_check['Close'].iloc[-1]
-                info = ticker.fast_info
-
-            # Get history for the change period
-            change_hist = ticker.history(period=change_period)
-            if not change_hist.empty and len(change_hist) > 1:
-                previous_price = change_hist['Close'].iloc[0]
-                change = current_price - previous_price
-                pct_change = (change / previous_price) * 100 if previous_price else 0
-            else:
-                previous_close = info.previous_close
-                change = current_price - previous_close if current_price and previous_close else 0
-                pct_change = (change / previous_close) * 100 if previous_close else 0
-            
-            # Get history for charts
-            history = ticker.history(period=period)
-            
-            # Get cached name (handle failure gracefully)
-            try:
-                long_name = get_etf_name(current_symbol)
-            except:
-                long_name = current_symbol # Fallback for display, but NOT cached
-            
-            return {
-                'symbol': current_symbol,
-                'name': long_name,
-                'current_price': current_price,
-                'change': change,
-                'pct_change': pct_change,
-                'history': history,
-                'currency': info.currency
-            }
-            
+            currencies[ticker_symbol] = resolve_listing(ticker_symbol)['currency']
         except Exception:
-            continue
+            print(f"Could not resolve currency for {ticker_symbol}")
+    return currencies
 
-    print(f"Error fetching data for {ticker_symbol}: All suffixes failed.")
-    return None
+def canonicalize_symbols(tickers):
+    """
+    Resolves a list of tickers in one pass.
+    Returns a de-duplicated list (original order) with resolved symbols;
+    tickers that cannot be resolved are kept as they are.
+    """
+    canonical = []
+    for ticker_symbol in tickers:
+        try:
+            symbol = resolve_symbol(ticker_symbol)
+        except Exception:
+            symbol = ticker_symbol
+        if symbol not in canonical:
+            canonical.append(symbol)
+    return canonical
 
-def get_comparative_data(tickers, start_date):
+def get_etf_data(ticker_symbol, period="1y", change_period="1d"):
     """
-    Fetches historical closing prices for a list of tickers from a start date.
-    Returns a DataFrame with normalized performance (percentage change from start).
+    Fetches current data and historical history for a given ticker.
     """
-    if not tickers:
-        return pd.DataFrame()
+    import yfinance as yf
     
-    data = {}
+    try:
+        listing = resolve_listing(ticker_symbol)
+    except Exception:
+        print(f"Error fetching data for {ticker_symbol}: All suffixes failed.")
+        return None
     
-    for ticker_symbol in tickers:
-        # We need to resolve the symbol again because the portfolio might have the short name
-        # but we need the one that works with yfinance (with suffix)
-        # However, usually we store the resolved symbol in the portfolio/watchlist.
-        # Let's assume the tickers passed are already resolved or try to resolve them.
+    current_symbol = listing['symbol']
+    try:
+        ticker = yf.Ticker(current_symbol)
+        info = ticker.fast_info
         
-        # Simple resolution logic similar to get_etf_data
-        suffixes_to_try = ["", ".DE", ".MI", ".L", ".PA", ".AS"]
-        found = False
+        # Fresh price; the resolution probe may be up to a day old
+        try:
+            current_price = info.last_price
+            if current_price is None:
+                raise ValueError("No price data")
+        except:
+            current_price = listing['price']
+
+        # Get history for the change period
+        change_hist = ticker.history(period=change_period)
+        if not change_hist.empty and len(change_hist) > 1:
+            previous_price = change_hist['Close'].iloc[0]
+            change = current_price - previous_price
+            pct_change = (change / previous_price) * 100 if previous_price else 0
+        else:
+            previous_close = info.previous_close
+            change = current_price - previous_close if current_price and previous_close else 0
+            pct_change = (change / previous_close) * 100 if previous_close else 0
         
-        for suffix in suffixes_to_try:
-            # If ticker already has a dot, maybe don't append suffix unless it failed?
-            # But get_etf_data logic is robust. Let's try to use the ticker as is first if it has a dot.
-            if "." in ticker_symbol and suffix == "":
-                 current_symbol = ticker_symbol
-            elif "." in ticker_symbol:
-                 continue # Don't add another suffix if one exists
-            else:
-                 current_symbol = f"{ticker_symbol}{suffix}"
-            
-            try:
-                t = yf.Ticker(current_symbol)
-                hist = t.history(start=start_date)
-                
-                if not hist.empty:
-                    # Normalize: (Price / Start_Price) - 1 * 100
-                    start_price = hist['Close'].iloc[0]
-                    if start_price > 0:
-                        data[ticker_symbol] = (hist['Close'] / start_price - 1) * 100
-                        found = True
-                        break
-            except:
-                continue
+        # Get history for charts
+        history = ticker.history(period=period)
         
-        if not found:
-            print(f"Could not fetch history for {ticker_symbol}")
+        # Get cached name (handle failure gracefully)
+        try:
+            long_name = get_etf_name(current_symbol)
+        except:
+            long_name = current_symbol # Fallback for display, but NOT cached
+        
+        return {
+            'symbol': current_symbol,
+            'name': long_name,
+            'current_price': current_price,
+            'change': change,
+            'pct_change': pct_change,
+            'history': history,
+            'currency': listing['currency']
+        }
+        
+    except Exception as e:
+        print(f"Error fetching data for {current_symbol}: {e}")
+        return None
 
-    return pd.DataFrame(data)
+def rebase_prices(price_history_df, start_date):
+    """
+    Rebases a price panel to 0% at start_date (percentage change from start).
+    Each ticker starts from its first available price on or after start_date,
+    so this is a cheap view over an already-loaded panel.
+    """
+    if price_history_df.empty:
+        return pd.DataFrame()
+    
+    start = pd.Timestamp(start_date)
+    if start.tz is None and price_history_df.index.tz is not None:
+        start = start.tz_localize(price_history_df.index.tz)
+    
+    panel = price_history_df.ffill()
+    panel = panel[panel.index >= start].dropna(axis=1, how='all')
+    if panel.empty:
+        return pd.DataFrame()
+    
+    # First valid price of each column is the base
+    base = panel.bfill().iloc[0]
+    base = base.where(base > 0)
+    return (panel / base - 1) * 100
+
+def get_comparative_data(tickers, start_date):
+    """
+    Fetches historical closing prices for a list of tickers from a start date.
+    Returns a DataFrame with normalized performance (percentage change from start).
+    """
+    return rebase_prices(get_historical_prices(tickers, start_date), start_date)
 
 def get_historical_prices(tickers, start_date):
     """
     Fetches raw historical closing prices for a list of tickers from a start date.
     Returns a DataFrame where columns are tickers and values are Close prices.
+    Prices come from the shared price store, so repeated calls don't refetch.
     """
     if not tickers:
         return pd.DataFrame()
     
+    # We need the symbol that works with yfinance (with suffix)
+    resolved = {}
+    for ticker_symbol in tickers:
+        try:
+            resolved[ticker_symbol] = resolve_symbol(ticker_symbol)
+        except Exception:
+            print(f"Could not fetch history for {ticker_symbol}")
+    
+    if not resolved:
+        return pd.DataFrame()
+    
+    closes = prices.get_store().get_closes(list(resolved.values()), start_date)
+    
     data = {}
+    for ticker_symbol, symbol in resolved.items():
+        if symbol in closes.columns and closes[symbol].notna().any():
+            data[ticker_symbol] = closes[symbol]
+        else:
+            print(f"Could not fetch history for {ticker_symbol}")
     
+    return pd.DataFrame(data)
+
+def get_corporate_actions(tickers):
+    """
+    Dividends and splits for a list of tickers from the shared corporate-actions store.
+    Returns {'Dividends': DataFrame, 'Stock Splits': DataFrame} with tickers as columns.
+    """
+    resolved = {}
     for ticker_symbol in tickers:
-        # Resolution logic (same as above)
-        suffixes_to_try = ["", ".DE", ".MI", ".L", ".PA", ".AS"]
-        found = False
-        
-        for suffix in suffixes_to_try:
-            if "." in ticker_symbol and suffix == "":
-                 current_symbol = ticker_symbol
-            elif "." in ticker_symbol:
-                 continue
-            else:
-                 current_symbol = f"{ticker_symbol}{suffix}"
-            
-            try:
-                t = yf.Ticker(current_symbol)
-                hist = t.history(start=start_date)
-                
-                if not hist.empty:
-                    data[ticker_symbol] = hist['Close']
-                    found = True
-                    break
-            except:
-                continue
-        
-        if not found:
-            print(f"Could not fetch history for {ticker_symbol}")
+        try:
+            resolved[ticker_symbol] = resolve_symbol(ticker_symbol)
+        except Exception:
+            pass
+    
+    events = actions.get_store().get_actions(list(resolved.values()))
+    return {
+        kind: pd.DataFrame({t: panel[s] for t, s in resolved.items()}, index=panel.index)
+        for kind, panel in events.items()
+    }
 
-    return pd.DataFrame(data)
+def get_total_return_prices(tickers, start_date):
+    """
+    Like get_historical_prices, with dividends reinvested (scaled so the last value
+    is the last close). Uses the cached corporate actions, so no extra request per call.
+    """
+    history = get_historical_prices(tickers, start_date)
+    if history.empty:
+        return history
+    return actions.total_return(history, get_corporate_actions(list(history.columns)))
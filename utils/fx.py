@@ -0,0 +1,90 @@
+import pandas as pd
+from utils import prices
+
+BASE_CURRENCIES = ["EUR", "USD", "GBP", "CHF"]
+CURRENCY_SYMBOLS = {'EUR': "€", 'USD': "$", 'GBP': "£", 'CHF': "CHF"}
+
+# Quotes in minor units (e.g. London listings in pence) -> (currency, factor)
+MINOR_UNITS = {
+    'GBp': ('GBP', 0.01),
+    'GBX': ('GBP', 0.01),
+    'ZAc': ('ZAR', 0.01),
+    'ILA': ('ILS', 0.01),
+}
+
+def normalize_currency(code):
+    """Returns (currency, factor) so that a price in `code` times factor is in `currency`."""
+    if code in MINOR_UNITS:
+        return MINOR_UNITS[code]
+    return (code.upper(), 1.0)
+
+def fx_symbol(currency, base):
+    """Yahoo symbol quoting one unit of `currency` in `base` (e.g. USDEUR=X)."""
+    return f"{currency}{base}=X"
+
+def get_rates(currencies, base, start_date):
+    """
+    Daily conversion rates into `base` for the given quote currencies.
+    Each pair is one column in the shared price store, so it is downloaded once
+    and only extended afterwards.
+    Returns a DataFrame (index=Date, columns=quote currencies as given).
+    Pairs that cannot be fetched are left at 1 with a warning.
+    """
+    currencies = list(dict.fromkeys(c for c in currencies if c))
+    normalized = {c: normalize_currency(c) for c in currencies}
+    base = base.upper()
+
+    pairs = sorted({fx_symbol(cur, base) for cur, _ in normalized.values() if cur != base})
+    closes = prices.get_store().get_closes(pairs, start_date) if pairs else pd.DataFrame()
+    closes = closes.ffill().bfill()
+
+    index = closes.index if not closes.empty else pd.DatetimeIndex([pd.Timestamp(start_date).normalize()], name='Date')
+    rates = pd.DataFrame(index=index)
+    for code, (cur, factor) in normalized.items():
+        symbol = fx_symbol(cur, base)
+        if cur == base:
+            rates[code] = factor
+        elif symbol in closes.columns and closes[symbol].notna().any():
+            rates[code] = closes[symbol] * factor
+        else:
+            print(f"Could not fetch FX rate {symbol}; values in {code} are not converted")
+            rates[code] = factor
+    return rates
+
+def get_ticker_rates(tickers, base, start_date):
+    """
+    Daily conversion rates into `base` for every ticker, from the currency cached
+    with its symbol resolution (no extra request per ticker).
+    Returns a DataFrame (index=Date, columns=tickers).
+    """
+    from utils import finance
+
+    currencies = finance.get_currencies(tickers)
+    # Tickers without currency metadata are assumed to be quoted in the base currency
+    codes = {t: currencies.get(t) or base for t in tickers}
+    rates = get_rates(codes.values(), base, start_date)
+    if rates.empty:
+        return pd.DataFrame(columns=list(tickers))
+    return pd.DataFrame(
+        rates[[codes[t] for t in tickers]].to_numpy(dtype=float),
+        index=rates.index,
+        columns=list(tickers)
+    )
+
+def convert_panel(price_history_df, rates):
+    """
+    Converts a price panel with daily rates (index=Date, same columns as the panel).
+    Each day uses the last rate on or before it; columns without a rate are left as they are.
+    """
+    if price_history_df.empty or rates.empty:
+        return price_history_df
+
+    days = pd.DatetimeIndex(price_history_df.index)
+    if days.tz is not None:
+        days = days.tz_localize(None)
+    days = days.normalize()
+
+    rates = rates.sort_index()
+    rows = (rates.index.searchsorted(days, side='right') - 1).clip(0, len(rates) - 1)
+    factors = rates.reindex(columns=price_history_df.columns).fillna(1.0).to_numpy(dtype=float)[rows]
+    return price_history_df * factors
@@ -0,0 +1,200 @@
+import random
+import threading
+import time
+import pandas as pd
+
+class YahooQuoteFeed:
+    """
+    Pulls today's intraday bars for many symbols in one batched request and
+    reduces them to one quote per symbol: the running daily candle plus last price.
+    """
+
+    def __init__(self, interval="1m"):
+        self.interval = interval
+
+    def fetch(self, symbols):
+        """Returns {symbol: quote} for the symbols that have intraday data."""
+        import yfinance as yf
+
+        data = yf.download(
+            symbols,
+            period="1d",
+            interval=self.interval,
+            auto_adjust=False,
+            progress=False,
+            threads=True
+        )
+        if data is None or data.empty:
+            return {}
+
+        fields = {}
+        for field in ['Open', 'High', 'Low', 'Close']:
+            values = data[field]
+            if isinstance(values, pd.Series):
+                values = values.to_frame(symbols[0])
+            fields[field] = values
+
+        # Reduce intraday bars to today's candle for every symbol at once
+        closes = fields['Close']
+        candle = pd.DataFrame({
+            'open': fields['Open'].bfill().iloc[0],
+            'high': fields['High'].max(),
+            'low': fields['Low'].min(),
+            'price': closes.ffill().iloc[-1],
+            'time': closes.apply(lambda col: col.last_valid_index())
+        }).dropna(subset=['price'])
+
+        return {symbol: row.to_dict() for symbol, row in candle.iterrows()}
+
+class LocalQuoteFeed:
+    """
+    Offline stand-in for YahooQuoteFeed: a seeded random walk per symbol.
+    Useful for tests and for running the live mode without network access.
+    """
+
+    def __init__(self, start_prices=None, volatility=0.001, change_probability=0.5, seed=0):
+        self.volatility = volatility
+        self.change_probability = change_probability
+        self._prices = dict(start_prices or {})
+        self._candles = {}
+        self._random = random.Random(seed)
+
+    def fetch(self, symbols):
+        now = pd.Timestamp.now()
+        quotes = {}
+        for symbol in symbols:
+            price = self._prices.get(symbol, 100.0)
+            # Not every symbol trades on every tick
+            if symbol in self._candles and self._random.random() > self.change_probability:
+                quotes[symbol] = self._candles[symbol]
+                continue
+
+            price = price * (1 + self._random.gauss(0, self.volatility))
+            self._prices[symbol] = price
+            candle = self._candles.get(symbol, {'open': price, 'high': price, 'low': price})
+            candle = {
+                'open': candle['open'],
+                'high': max(candle['high'], price),
+                'low': min(candle['low'], price),
+                'price': price,
+                'time': now
+            }
+            self._candles[symbol] = candle
+            quotes[symbol] = candle
+        return quotes
+
+class QuotePoller:
+    """
+    Single background poller shared by every viewer of the process.
+    Watched symbols are fetched in batches every `interval` seconds and each
+    symbol's version only changes when its price does, so readers can skip
+    redrawing tickers that didn't move.
+    """
+
+    def __init__(self, feed, interval=15, batch_size=50, idle_timeout=300):
+        self.feed = feed
+        self.interval = interval
+        self.batch_size = batch_size
+        self.idle_timeout = idle_timeout
+
+        self._lock = threading.Lock()
+        self._symbols = set()
+        self._quotes = {}  # symbol -> quote dict
+        self._versions = {}  # symbol -> int, bumped on every price change
+        self._last_read = time.time()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def watch(self, symbols):
+        """Adds symbols to the polling set."""
+        with self._lock:
+            self._symbols.update(symbols)
+
+    def poll_once(self):
+        """Fetches all watched symbols in batches and records the ones that changed."""
+        with self._lock:
+            symbols = sorted(self._symbols)
+
+        changed = []
+        for i in range(0, len(symbols), self.batch_size):
+            batch = symbols[i:i + self.batch_size]
+            try:
+                quotes = self.feed.fetch(batch)
+            except Exception as e:
+                print(f"Error polling quotes for {batch}: {e}")
+                continue
+
+            with self._lock:
+                for symbol, quote in quotes.items():
+                    previous = self._quotes.get(symbol)
+                    if previous is not None and previous['price'] == quote['price']:
+                        continue
+                    self._quotes[symbol] = quote
+                    self._versions[symbol] = self._versions.get(symbol, 0) + 1
+                    changed.append(symbol)
+        return changed
+
+    def get(self, symbol):
+        """Returns (version, quote) for a symbol; (0, None) before its first quote."""
+        with self._lock:
+            self._last_read = time.time()
+            return self._versions.get(symbol, 0), self._quotes.get(symbol)
+
+    def peek(self, symbol):
+        """Like get(), for background readers: doesn't count as someone watching, so the poller still idles out."""
+        with self._lock:
+            return self._versions.get(symbol, 0), self._quotes.get(symbol)
+
+    def _run(self):
+        while not self._stop.is_set():
+            # Nobody is looking: let the thread go until the next start()
+            if time.time() - self._last_read > self.idle_timeout:
+                break
+            self.poll_once()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """Starts the polling thread if it isn't running."""
+        with self._lock:
+            self._last_read = time.time()
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="quote-poller", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+def apply_quote(history, quote):
+    """
+    Returns a copy of a daily OHLC history whose last candle reflects the live quote.
+    A quote from a new day appends a candle instead of overwriting yesterday's.
+    """
+    if history.empty or quote is None:
+        return history
+
+    history = history.copy()
+    quote_day = pd.Timestamp(quote['time'])
+    if history.index.tz is not None:
+        quote_day = quote_day.tz_localize(history.index.tz) if quote_day.tz is None else quote_day.tz_convert(history.index.tz)
+    elif quote_day.tz is not None:
+        quote_day = quote_day.tz_localize(None)
+    quote_day = quote_day.normalize()
+
+    if history.index[-1].normalize() == quote_day:
+        last = history.index[-1]
+        history.loc[last, 'High'] = max(history.loc[last, 'High'], quote['high'])
+        history.loc[last, 'Low'] = min(history.loc[last, 'Low'], quote['low'])
+        history.loc[last, 'Close'] = quote['price']
+    elif quote_day > history.index[-1]:
+        history.loc[quote_day, ['Open', 'High', 'Low', 'Close']] = [
+            quote['open'], quote['high'], quote['low'], quote['price']
+        ]
+    return history
+
+_poller = QuotePoller(YahooQuoteFeed())
+
+def get_poller():
+    """Returns the quote poller shared by the whole process."""
+    return _poller
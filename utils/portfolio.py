@@ -1,10 +1,12 @@
 import pandas as pd
+import numpy as np
 import os
 from datetime import datetime
-import gspread
-from google.oauth2.service_account import Credentials
+from utils import actions, fx, returns
 
 PORTFOLIO_FILE = "portfolio.csv"  # Fallback
+TOTAL_LABEL = "Total"
+EXPECTED_COLS = ['Date', 'ISIN', 'Ticker', 'Price', 'Quantity']
 SCOPES = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive']
 
 def get_gsheets_client():
@@ -12,6 +14,9 @@ def get_gsheets_client():
     try:
         import streamlit as st
         if "gcp_service_account" in st.secrets:
+            # Only pay for the Google client libraries when Sheets is configured
+            import gspread
+            from google.oauth2.service_account import Credentials
             credentials_dict = dict(st.secrets["gcp_service_account"])
             creds = Credentials.from_service_account_info(credentials_dict, scopes=SCOPES)
             return gspread.authorize(creds)
@@ -21,8 +26,6 @@ def get_gsheets_client():
 
 def load_portfolio():
     """Loads the portfolio from Google Sheets or CSV fallback."""
-    expected_cols = ['Date', 'ISIN', 'Ticker', 'Price', 'Quantity']
-    
     # Try Google Sheets first
     client = get_gsheets_client()
     if client:
@@ -34,22 +37,39 @@ def load_portfolio():
                 worksheet = sheet.get_worksheet(0)
                 data = worksheet.get_all_records()
                 df = pd.DataFrame(data)
-                if not df.empty and all(col in df.columns for col in expected_cols):
+                if not df.empty and all(col in df.columns for col in EXPECTED_COLS):
                     return df
         except Exception as e:
             print(f"Error loading from Google Sheets: {e}")
     
     # Fallback to CSV
-    if os.path.exists(PORTFOLIO_FILE):
+    return load_portfolio_file(PORTFOLIO_FILE)
+
+def load_portfolio_file(path):
+    """Loads a portfolio CSV (same format as PORTFOLIO_FILE); empty portfolio if missing or invalid."""
+    if os.path.exists(path):
         try:
-            df = pd.read_csv(PORTFOLIO_FILE)
-            if not all(col in df.columns for col in expected_cols):
-                return pd.DataFrame(columns=expected_cols)
+            df = pd.read_csv(path)
+            if not all(col in df.columns for col in EXPECTED_COLS):
+                return pd.DataFrame(columns=EXPECTED_COLS)
             return df
         except Exception:
-            return pd.DataFrame(columns=expected_cols)
+            return pd.DataFrame(columns=EXPECTED_COLS)
     else:
-        return pd.DataFrame(columns=expected_cols)
+        return pd.DataFrame(columns=EXPECTED_COLS)
+
+def load_portfolio_sheet(sheet_id):
+    """Loads a portfolio from the first worksheet of a Google Sheet, by sheet ID."""
+    client = get_gsheets_client()
+    if client:
+        try:
+            worksheet = client.open_by_key(sheet_id).get_worksheet(0)
+            df = pd.DataFrame(worksheet.get_all_records())
+            if not df.empty and all(col in df.columns for col in EXPECTED_COLS):
+                return df
+        except Exception as e:
+            print(f"Error loading sheet {sheet_id}: {e}")
+    return pd.DataFrame(columns=EXPECTED_COLS)
 
 def save_portfolio(df):
     """Saves the portfolio DataFrame to Google Sheets or CSV fallback."""
@@ -129,15 +149,287 @@ def add_transaction(date, isin, ticker, price, quantity):
     save_portfolio(df)
     return df
 
-def calculate_performance(portfolio_df, current_prices, price_history_df=None):
+# Header names used by common broker exports, mapped to our columns (matched case-insensitively)
+COLUMN_ALIASES = {
+    'Date': ['date', 'trade date', 'transaction date', 'execution date', 'settlement date', 'data', 'datum'],
+    'ISIN': ['isin', 'isin code'],
+    'Ticker': ['ticker', 'symbol', 'ticker symbol', 'simbolo'],
+    'Price': ['price', 'unit price', 'execution price', 'share price', 'prezzo', 'kurs'],
+    'Quantity': ['quantity', 'qty', 'shares', 'units', 'quantità', 'quantita', 'anzahl', 'stück'],
+}
+
+def _parse_numbers(series):
+    """
+    Parses numbers written as 1234.56, 1,234.56, 1.234,56 or 1234,56 (vectorized).
+    A value like 1,000 is read with the separator the rest of the column uses and
+    is left unparsed when the column doesn't tell.
+    Returns a float Series with NaN for anything unparseable.
+    """
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype(float)
+    
+    text = series.astype(str).str.replace(r'[^\d,.\-]', '', regex=True)
+    has_comma = text.str.contains(',', regex=False)
+    has_dot = text.str.contains('.', regex=False)
+    # A comma is the decimal separator if it's the only separator or comes after the last dot
+    decimal_comma = has_comma & (~has_dot | (text.str.rfind(',') > text.str.rfind('.')))
+    
+    # 1,000 is one thousand or one; 1.000 likewise the other way round
+    ambiguous_comma = text.str.fullmatch(r'-?\d{1,3},\d{3}')
+    ambiguous_dot = text.str.fullmatch(r'-?\d{1,3}\.\d{3}')
+    european_column = (decimal_comma & ~ambiguous_comma).any()
+    english_column = (has_dot & ~decimal_comma & ~ambiguous_dot).any()
+    if english_column and not european_column:
+        decimal_comma = decimal_comma & ~ambiguous_comma
+    elif european_column == english_column:
+        text = text.mask(ambiguous_comma)
+    
+    european = text.str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
+    english = text.str.replace(',', '', regex=False)
+    return pd.to_numeric(english.where(~decimal_comma, european), errors='coerce')
+
+def _parse_dates(series):
+    """Parses ISO dates first, then day-first dates (e.g. 31/01/2024) for the rest."""
+    dates = pd.to_datetime(series, errors='coerce', format='ISO8601')
+    # Invalid ISO dates (2024-13-01) stay invalid instead of being read day-first
+    iso_like = series.astype(str).str.strip().str.match(r'\d{4}-\d{1,2}-\d{1,2}')
+    missing = dates.isna() & series.notna() & ~iso_like
+    if missing.any():
+        dates[missing] = pd.to_datetime(series[missing], errors='coerce', dayfirst=True, format='mixed')
+    return dates
+
+def normalize_transactions(raw_df):
+    """
+    Maps a broker export to our columns and normalizes dates, numbers and tickers.
+    Returns (valid_df, rejected_df); rejected rows keep their raw values plus an 'Error' column.
+    """
+    lookup = {alias: col for col, aliases in COLUMN_ALIASES.items() for alias in aliases}
+    renamed = raw_df.rename(columns=lambda c: lookup.get(str(c).strip().lower(), c))
+    renamed = renamed.loc[:, ~renamed.columns.duplicated()]
+    
+    missing_cols = [c for c in EXPECTED_COLS if c not in renamed.columns and c != 'ISIN']
+    if missing_cols:
+        raise ValueError(f"Missing columns: {', '.join(missing_cols)}")
+    
+    df = pd.DataFrame(index=renamed.index)
+    df['Date'] = _parse_dates(renamed['Date'])
+    df['ISIN'] = renamed['ISIN'].fillna('').astype(str).str.strip().str.upper() if 'ISIN' in renamed.columns else ''
+    df['Ticker'] = renamed['Ticker'].fillna('').astype(str).str.strip().str.upper()
+    df['Price'] = _parse_numbers(renamed['Price'])
+    df['Quantity'] = _parse_numbers(renamed['Quantity'])
+    
+    errors = pd.Series('', index=df.index)
+    errors = errors.mask(df['Quantity'].isna() | (df['Quantity'] == 0), 'Invalid quantity')
+    errors = errors.mask(df['Price'].isna() | (df['Price'] < 0), 'Invalid price')
+    errors = errors.mask(df['Ticker'] == '', 'Missing ticker')
+    errors = errors.mask(df['Date'].isna(), 'Invalid date')
+    
+    rejected = raw_df[errors != ''].copy()
+    rejected['Error'] = errors[errors != '']
+    
+    valid = df[errors == ''].copy()
+    valid['Date'] = valid['Date'].dt.strftime('%Y-%m-%d')
+    return valid[EXPECTED_COLS], rejected
+
+def _transaction_keys(df):
+    """One 64-bit hash per transaction (date, ticker, price, quantity), used to spot duplicates."""
+    keys = pd.DataFrame({
+        'Date': pd.to_datetime(df['Date'], errors='coerce').dt.strftime('%Y-%m-%d'),
+        'Ticker': df['Ticker'].astype(str).str.strip().str.upper(),
+        # Always float: the hash of int64 2 differs from the hash of float64 2.0
+        'Price': pd.to_numeric(df['Price'], errors='coerce').astype(float).round(6),
+        'Quantity': pd.to_numeric(df['Quantity'], errors='coerce').astype(float).round(6),
+    })
+    return pd.util.hash_pandas_object(keys, index=False)
+
+def append_transactions(df):
+    """Persists many transactions with a single append (Google Sheets) or a single CSV write."""
+    if df.empty:
+        return
+    
+    client = get_gsheets_client()
+    if client:
+        try:
+            import streamlit as st
+            sheet_url = st.secrets.get("PORTFOLIO_SHEET_URL", "")
+            if sheet_url:
+                sheet = client.open_by_url(sheet_url)
+                worksheet = sheet.get_worksheet(0)
+                
+                # Ensure correct order: Date, ISIN, Ticker, Price, Quantity
+                values = df[EXPECTED_COLS].astype(object).values.tolist()
+                worksheet.append_rows(values)
+                return
+        except Exception as e:
+            print(f"Error appending to Google Sheets: {e}")
+    
+    # Fallback: one CSV write
+    if os.path.exists(PORTFOLIO_FILE):
+        df[EXPECTED_COLS].to_csv(PORTFOLIO_FILE, mode='a', header=False, index=False)
+    else:
+        df[EXPECTED_COLS].to_csv(PORTFOLIO_FILE, index=False)
+
+def import_transactions(raw_df, resolver=None, existing_df=None):
+    """
+    Bulk-imports transactions from a broker export.
+    resolver: optional callable mapping a ticker to its resolved symbol (raises if unknown);
+              tickers already in the portfolio, or resolving to a symbol that is, keep the
+              portfolio's spelling
+    existing_df: current portfolio (loaded if not given), used to skip duplicates
+    Returns a dict with 'imported' (DataFrame), 'duplicates' (int) and 'rejected' (DataFrame).
+    """
+    valid, rejected = normalize_transactions(raw_df)
+    if existing_df is None:
+        existing_df = load_portfolio()
+    
+    if resolver is not None and not valid.empty:
+        # Resolve each distinct ticker once
+        def resolve(ticker):
+            try:
+                return resolver(ticker)
+            except Exception:
+                return None
+        
+        existing_tickers = existing_df['Ticker'].astype(str).unique() if not existing_df.empty else []
+        spelling = {}
+        for ticker in existing_tickers:
+            spelling.setdefault(resolve(ticker), ticker)
+        spelling.pop(None, None)
+        
+        stored = {str(t).strip().upper(): t for t in existing_tickers}
+        mapping = {}
+        for ticker in valid['Ticker'].unique():
+            # Already held: keep the listing its trades are valued with
+            if ticker in stored:
+                mapping[ticker] = stored[ticker]
+                continue
+            symbol = resolve(ticker)
+            mapping[ticker] = spelling.get(symbol, symbol) if symbol else None
+        
+        resolved = valid['Ticker'].map(mapping)
+        unknown = resolved.isna()
+        if unknown.any():
+            unknown_rows = raw_df.loc[valid.index[unknown]].copy()
+            unknown_rows['Error'] = 'Unknown ticker'
+            rejected = pd.concat([rejected, unknown_rows])
+        valid = valid[~unknown].copy()
+        valid['Ticker'] = resolved[~unknown]
+    
+    # Hash index of existing rows; also drop repeats within the file
+    keys = _transaction_keys(valid)
+    existing_keys = pd.Index(_transaction_keys(existing_df)) if not existing_df.empty else pd.Index([])
+    new_rows = ~keys.isin(existing_keys) & ~keys.duplicated()
+    imported = valid[new_rows.values]
+    
+    append_transactions(imported)
+    return {
+        'imported': imported.reset_index(drop=True),
+        'duplicates': int((~new_rows).sum()),
+        'rejected': rejected
+    }
+
+def _units(portfolio_df):
+    """Units to value each trade with: 'Units' after apply_corporate_actions, else Quantity."""
+    if 'Units' in portfolio_df.columns:
+        return portfolio_df['Units']
+    return portfolio_df['Quantity']
+
+def held_shares(portfolio_df):
+    """
+    Shares held per ticker today, as traded at today's prices: Quantity carried across
+    splits ('Shares' after apply_corporate_actions), without reinvested dividends.
+    """
+    column = 'Shares' if 'Shares' in portfolio_df.columns else 'Quantity'
+    return portfolio_df.groupby('Ticker')[column].sum()
+
+def apply_corporate_actions(portfolio_df, price_history_df, corporate_actions):
+    """
+    Values holdings with distributions reinvested and trades carried across splits.
+    Adds a 'Units' column with each trade's equivalent units today (split ratios after
+    the trade times the dividend reinvestment since it), used only for valuation, and
+    a 'Shares' column with the split ratios only (see held_shares); Quantity and Price
+    stay what was actually traded. The price panel becomes the
+    matching total-return series.
+    corporate_actions: {'Dividends': DataFrame, 'Stock Splits': DataFrame} with tickers
+    as columns, e.g. from finance.get_corporate_actions
+    Returns (portfolio_df, price_history_df) adjusted.
+    """
+    if not corporate_actions or price_history_df is None or price_history_df.empty or portfolio_df.empty:
+        return portfolio_df, price_history_df
+    
+    reinvest, split = actions.adjustment_factors(price_history_df, corporate_actions)
+    # Leading row of ones for trades before the first day of the panel
+    ones = np.ones((1, reinvest.shape[1]))
+    reinvest_padded = np.vstack([ones, reinvest])
+    split_padded = np.vstack([ones, split])
+    
+    days = pd.DatetimeIndex(price_history_df.index)
+    if days.tz is not None:
+        days = days.tz_localize(None)
+    days = days.normalize()
+    
+    # Factors as of the close of each trade date, gathered for all trades at once
+    portfolio_df = portfolio_df.copy()
+    tx_days = pd.DatetimeIndex(pd.to_datetime(portfolio_df['Date']).dt.normalize())
+    rows = days.searchsorted(tx_days, side='right')
+    cols = price_history_df.columns.get_indexer(portfolio_df['Ticker'])
+    known = cols >= 0
+    cols = cols.clip(0)
+    split_factor = np.where(known, split_padded[-1, cols] / split_padded[rows, cols], 1.0)
+    reinvest_factor = np.where(known, reinvest_padded[-1, cols] / reinvest_padded[rows, cols], 1.0)
+    
+    shares = portfolio_df['Shares'] if 'Shares' in portfolio_df.columns else portfolio_df['Quantity']
+    portfolio_df['Shares'] = shares * split_factor
+    portfolio_df['Units'] = _units(portfolio_df) * split_factor * reinvest_factor
+    return portfolio_df, price_history_df * (reinvest / reinvest[-1])
+
+def to_base_currency(portfolio_df, current_prices, price_history_df, fx_rates):
+    """
+    Converts transaction prices (at the rate of their trade date), current prices
+    (latest rate) and the price history (daily rates) into the base currency.
+    fx_rates: DataFrame (index=Date, columns=tickers) of base units per unit of each
+    ticker's quote price, e.g. from fx.get_ticker_rates
+    Returns (portfolio_df, current_prices, price_history_df) converted.
+    """
+    if fx_rates is None or fx_rates.empty:
+        return portfolio_df, current_prices, price_history_df
+    
+    rates = fx_rates.sort_index()
+    rate_values = rates.to_numpy(dtype=float)
+    
+    # One gather for all transactions: last rate on or before each trade date
+    portfolio_df = portfolio_df.copy()
+    tx_days = pd.DatetimeIndex(pd.to_datetime(portfolio_df['Date']).dt.normalize())
+    rows = (rates.index.searchsorted(tx_days, side='right') - 1).clip(0, len(rates) - 1)
+    cols = rates.columns.get_indexer(portfolio_df['Ticker'])
+    tx_rates = np.where(cols >= 0, rate_values[rows, cols.clip(0)], 1.0)
+    portfolio_df['Price'] = portfolio_df['Price'] * tx_rates
+    
+    latest = rates.iloc[-1]
+    current_prices = {t: p * latest.get(t, 1.0) for t, p in current_prices.items()}
+    
+    if price_history_df is not None:
+        price_history_df = fx.convert_panel(price_history_df, rates)
+    return portfolio_df, current_prices, price_history_df
+
+def calculate_performance(portfolio_df, current_prices, price_history_df=None, fx_rates=None, corporate_actions=None,
+                          include_total=False):
     """
     Calculates performance metrics for the portfolio.
     current_prices: dict {ticker: price}
     price_history_df: DataFrame with historical prices (optional, for annualized return calculation)
+    fx_rates: DataFrame of rates into the base currency (optional, see to_base_currency)
+    corporate_actions: dividends and splits (optional, see apply_corporate_actions)
+    include_total: append a TOTAL_LABEL row with the portfolio's values, XIRR and TWR
     """
     if portfolio_df.empty:
         return pd.DataFrame()
     
+    portfolio_df, price_history_df = apply_corporate_actions(portfolio_df, price_history_df, corporate_actions)
+    portfolio_df, current_prices, price_history_df = to_base_currency(
+        portfolio_df, current_prices, price_history_df, fx_rates
+    )
+    
     # Ensure Date column is datetime
     portfolio_df = portfolio_df.copy()
     portfolio_df['Date'] = pd.to_datetime(portfolio_df['Date'])
@@ -160,7 +452,8 @@ def calculate_performance(portfolio_df, current_prices, price_history_df=None):
         
         current_price = current_prices.get(ticker, 0)
         
-        current_value = total_qty * current_price
+        # Valued on the units actually owned today (reinvested distributions, splits)
+        current_value = _units(group).sum() * current_price
         invested_value = total_qty * avg_price
         
         gain_loss = current_value - invested_value
@@ -207,69 +500,211 @@ def calculate_performance(portfolio_df, current_prices, price_history_df=None):
             'Annualized Return %': annualized_return
         })
         
-    return pd.DataFrame(summary)
+    summary_df = pd.DataFrame(summary)
+    if summary_df.empty:
+        return summary_df
+    
+    if include_total:
+        invested = summary_df['Invested Value'].sum()
+        current = summary_df['Current Value'].sum()
+        summary_df = pd.concat([summary_df, pd.DataFrame([{
+            'Ticker': TOTAL_LABEL,
+            'Invested Value': invested,
+            'Current Value': current,
+            'Gain/Loss': current - invested,
+            'Gain/Loss %': (current - invested) / invested * 100 if invested != 0 else 0
+        }])], ignore_index=True)
+    
+    # Money- and time-weighted returns, solved for all tickers (and the total) at once
+    return_metrics = calculate_return_metrics(portfolio_df, current_prices, price_history_df)
+    return summary_df.merge(return_metrics, left_on='Ticker', right_index=True, how='left')
 
-def calculate_historical_performance(portfolio_df, price_history_df):
+def _cash_flow_matrix(portfolio_df, current_prices, now):
     """
-    Calculates daily absolute gain/loss history.
+    Builds padded (series x flows) matrices of cash flows and their times in years,
+    one row per ticker plus one for the whole portfolio.
+    Purchases are negative flows; the current value is a final positive flow.
+    """
+    tx = portfolio_df[['Date', 'Ticker']].copy()
+    tx['Flow'] = -(portfolio_df['Price'] * portfolio_df['Quantity'])
+    
+    # Terminal value of every position at today's price
+    quantities = _units(portfolio_df).groupby(portfolio_df['Ticker']).sum()
+    prices = pd.Series(current_prices, dtype=float).reindex(quantities.index).fillna(0)
+    terminal = pd.DataFrame({
+        'Date': now,
+        'Ticker': quantities.index,
+        'Flow': (quantities * prices).values
+    })
+    
+    flows = pd.concat([tx, terminal], ignore_index=True)
+    flows = pd.concat([flows, flows.assign(Ticker=TOTAL_LABEL)], ignore_index=True)
+    
+    first_date = flows.groupby('Ticker')['Date'].transform('min')
+    flows['Years'] = (flows['Date'] - first_date).dt.days / 365
+    flows['Slot'] = flows.groupby('Ticker').cumcount()
+    
+    cashflows = flows.pivot(index='Ticker', columns='Slot', values='Flow').fillna(0)
+    years = flows.pivot(index='Ticker', columns='Slot', values='Years').fillna(0)
+    return cashflows, years
+
+def _time_weighted_returns(portfolio_df, price_history_df, current_prices, now):
+    """
+    Annualized time-weighted return per ticker and for the whole portfolio,
+    valued daily on the price history. Returns a Series indexed by ticker.
+    """
+    tickers = [t for t in portfolio_df['Ticker'].unique() if t in price_history_df.columns]
+    if not tickers:
+        return pd.Series(dtype=float)
+    
+    prices = price_history_df[tickers].copy()
+    prices.index = pd.to_datetime(prices.index)
+    if prices.index.tz is not None:
+        prices.index = prices.index.tz_localize(None)
+    prices.index = prices.index.normalize()
+    prices = prices[~prices.index.duplicated(keep='last')]
+    
+    tx = portfolio_df[portfolio_df['Ticker'].isin(tickers)].copy()
+    tx['Amount'] = tx['Price'] * tx['Quantity']
+    tx['Units'] = _units(tx)
+    tx['Buy'] = tx['Amount'].clip(lower=0)
+    tx['Sell'] = (-tx['Amount']).clip(lower=0)
+    
+    dates = prices.index.union(pd.DatetimeIndex(tx['Date'].unique())).union([now])
+    quantity = tx.pivot_table(index='Date', columns='Ticker', values='Units', aggfunc='sum')
+    buys = tx.pivot_table(index='Date', columns='Ticker', values='Buy', aggfunc='sum')
+    sells = tx.pivot_table(index='Date', columns='Ticker', values='Sell', aggfunc='sum')
+    quantity = quantity.reindex(index=dates, columns=tickers).fillna(0).cumsum()
+    buys = buys.reindex(index=dates, columns=tickers).fillna(0)
+    sells = sells.reindex(index=dates, columns=tickers).fillna(0)
+    
+    prices = prices.reindex(dates).ffill()
+    # Today's value uses the live price where we have one
+    live = pd.Series(current_prices, dtype=float).reindex(tickers)
+    live = live[live > 0]
+    prices.loc[now, live.index] = live.values
+    
+    market_value = quantity * prices
+    priced = market_value.notna() | (quantity == 0)
+    market_value = market_value.fillna(0)
+    buys = buys.where(priced, 0)
+    sells = sells.where(priced, 0)
+    
+    # Add the whole portfolio as one more series
+    market_value[TOTAL_LABEL] = market_value.sum(axis=1)
+    buys[TOTAL_LABEL] = buys.sum(axis=1)
+    sells[TOTAL_LABEL] = sells.sum(axis=1)
+    
+    total_return = returns.time_weighted_return(market_value.values, buys.values, sells.values)
+    
+    first_dates = tx.groupby('Ticker')['Date'].min().reindex(tickers)
+    first_dates[TOTAL_LABEL] = tx['Date'].min()
+    years = (now - first_dates).dt.days.values / 365
+    
+    return pd.Series(returns.annualize(total_return, years) * 100, index=market_value.columns)
+
+def calculate_return_metrics(portfolio_df, current_prices, price_history_df=None):
+    """
+    Money-weighted (XIRR) and time-weighted annualized returns per ticker
+    and for the whole portfolio (row labelled TOTAL_LABEL).
+    current_prices: dict {ticker: price}
+    price_history_df: DataFrame with daily close prices (optional, needed for the time-weighted return)
+    Returns a DataFrame indexed by ticker with 'XIRR %' and 'TWR %'.
+    """
+    if portfolio_df.empty:
+        return pd.DataFrame(columns=['XIRR %', 'TWR %'])
+    
+    portfolio_df = portfolio_df.copy()
+    portfolio_df['Date'] = pd.to_datetime(portfolio_df['Date']).dt.normalize()
+    now = pd.Timestamp.now().normalize()
+    
+    cashflows, years = _cash_flow_matrix(portfolio_df, current_prices, now)
+    metrics = pd.DataFrame(index=cashflows.index)
+    metrics['XIRR %'] = returns.xirr(cashflows.values, years.values) * 100
+    
+    if price_history_df is not None and not price_history_df.empty:
+        metrics['TWR %'] = _time_weighted_returns(portfolio_df, price_history_df, current_prices, now)
+    else:
+        metrics['TWR %'] = np.nan
+    
+    return metrics
+
+def calculate_contributions(portfolio_df, price_history_df):
+    """
+    Per-ticker daily holdings value and gain/loss, built in one vectorized pass.
     portfolio_df: DataFrame with transactions
     price_history_df: DataFrame with daily close prices for all tickers (index=Date)
+    Returns a dict of DataFrames (index=Date, columns=tickers):
+    'Invested Value', 'Market Value' and 'Gain/Loss'.
+    Days before the first transaction are dropped.
     """
     if portfolio_df.empty or price_history_df.empty:
-        return pd.DataFrame()
-        
-    # Ensure Date is datetime and normalize (remove time/tz)
+        return {}
+    
     portfolio_df = portfolio_df.copy()
     portfolio_df['Date'] = pd.to_datetime(portfolio_df['Date'])
+    tickers = list(portfolio_df['Ticker'].unique())
     
-    # Sort transactions by date
-    portfolio_df = portfolio_df.sort_values('Date')
+    # Compare calendar days only (removes time and timezone)
+    days = pd.DatetimeIndex(price_history_df.index)
+    if days.tz is not None:
+        days = days.tz_localize(None)
+    days = days.normalize()
     
-    # Forward-fill missing prices to handle gaps (holidays, data issues)
-    price_history_df = price_history_df.fillna(method='ffill')
+    # Row of the first price day on or after each transaction
+    tx_rows = np.searchsorted(days.values, portfolio_df['Date'].dt.normalize().values, side='left')
+    tx_cols = pd.Index(tickers).get_indexer(portfolio_df['Ticker'])
+    in_range = tx_rows < len(days)
+    tx_rows, tx_cols = tx_rows[in_range], tx_cols[in_range]
+    quantities = _units(portfolio_df).to_numpy(dtype=float)[in_range]
+    amounts = (portfolio_df['Price'] * portfolio_df['Quantity']).to_numpy(dtype=float)[in_range]
     
-    daily_stats = []
+    # Scatter transactions into (days x tickers) and accumulate over time
+    holdings = np.zeros((len(days), len(tickers)))
+    invested = np.zeros((len(days), len(tickers)))
+    np.add.at(holdings, (tx_rows, tx_cols), quantities)
+    np.add.at(invested, (tx_rows, tx_cols), amounts)
+    holdings = holdings.cumsum(axis=0)
+    invested = invested.cumsum(axis=0)
     
-    # Iterate through each day in price history
-    for date in price_history_df.index:
-        # Convert both to date objects for comparison (removes time and timezone)
-        date_only = pd.Timestamp(date).date()
-        mask = portfolio_df['Date'].dt.date <= date_only
-        current_transactions = portfolio_df[mask]
-        
-        if current_transactions.empty:
-            continue
-            
-        # Calculate holdings and invested value
-        holdings = {}
-        invested_value = 0.0
-        
-        for _, row in current_transactions.iterrows():
-            ticker = row['Ticker']
-            qty = row['Quantity']
-            price = row['Price']
-            
-            holdings[ticker] = holdings.get(ticker, 0) + qty
-            invested_value += (price * qty)
-            
-        # Calculate current market value
-        current_market_value = 0.0
-        for ticker, qty in holdings.items():
-            if ticker in price_history_df.columns:
-                # Get price for this date (now forward-filled, so should rarely be NaN)
-                daily_price = price_history_df.loc[date, ticker]
-                if pd.notnull(daily_price):
-                    current_market_value += (qty * daily_price)
-                # If still NaN after forward-fill, skip this ticker for this day
-                # (this would only happen if no prior data exists)
-        
-        gain_loss = current_market_value - invested_value
-        
-        daily_stats.append({
-            'Date': date,
-            'Invested Value': invested_value,
-            'Market Value': current_market_value,
-            'Gain/Loss': gain_loss
-        })
-        
-    return pd.DataFrame(daily_stats).set_index('Date')
+    # Forward-fill missing prices to handle gaps (holidays, data issues);
+    # tickers without any prior price are valued at 0 for that day
+    prices = price_history_df.ffill().reindex(columns=tickers).to_numpy(dtype=float)
+    market_value = np.nan_to_num(holdings * prices, nan=0.0)
+    
+    started = np.zeros(len(days), dtype=bool)
+    started[tx_rows] = True
+    started = np.logical_or.accumulate(started)
+    
+    index = price_history_df.index[started]
+    invested_df = pd.DataFrame(invested[started], index=index, columns=tickers)
+    market_df = pd.DataFrame(market_value[started], index=index, columns=tickers)
+    return {
+        'Invested Value': invested_df,
+        'Market Value': market_df,
+        'Gain/Loss': market_df - invested_df
+    }
+
+def calculate_historical_performance(portfolio_df, price_history_df, fx_rates=None, corporate_actions=None):
+    """
+    Calculates daily absolute gain/loss history.
+    portfolio_df: DataFrame with transactions
+    price_history_df: DataFrame with daily close prices for all tickers (index=Date)
+    fx_rates: DataFrame of rates into the base currency (optional, see to_base_currency)
+    corporate_actions: dividends and splits (optional, see apply_corporate_actions)
+    """
+    if not portfolio_df.empty:
+        portfolio_df, price_history_df = apply_corporate_actions(portfolio_df, price_history_df, corporate_actions)
+        portfolio_df, _, price_history_df = to_base_currency(portfolio_df, {}, price_history_df, fx_rates)
+    contributions = calculate_contributions(portfolio_df, price_history_df)
+    if not contributions or contributions['Market Value'].empty:
+        return pd.DataFrame()
+    
+    # The portfolio is the sum of its holdings
+    history = pd.DataFrame({
+        'Invested Value': contributions['Invested Value'].sum(axis=1),
+        'Market Value': contributions['Market Value'].sum(axis=1)
+    })
+    history['Gain/Loss'] = history['Market Value'] - history['Invested Value']
+    history.index.name = 'Date'
+    return history
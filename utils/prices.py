@@ -0,0 +1,127 @@
+import threading
+import time
+import pandas as pd
+
+class PriceStore:
+    """
+    Process-wide cache of daily close prices (index=Date, columns=resolved symbols).
+    Missing histories are downloaded in one batched request and cached histories
+    are only extended with the bars after the last one we have, so every tab,
+    rerun and session reads the same panel. Symbols whose download fails or comes
+    back empty are retried after `retry_seconds`, not on every call.
+    """
+
+    def __init__(self, refresh_seconds=900, retry_seconds=300):
+        self.refresh_seconds = refresh_seconds
+        self.retry_seconds = retry_seconds
+        self.version = 0
+        self.updated_at = None
+
+        self._lock = threading.RLock()
+        # Dated index from the start, so filtering by date works before the first download succeeds
+        self._closes = pd.DataFrame(index=pd.DatetimeIndex([]))
+        self._covered_from = {}  # symbol -> earliest date loaded
+        self._refreshed_at = {}  # symbol -> time.time() of last download
+        self._failed_at = {}     # symbol -> time.time() of the last download that returned nothing
+
+    def _download(self, symbols, start_date):
+        """Downloads daily closes for many symbols in one request."""
+        import yfinance as yf
+
+        try:
+            # Traded closes (split-adjusted only); distributions come from the corporate-actions store
+            data = yf.download(
+                symbols,
+                start=start_date,
+                auto_adjust=False,
+                progress=False,
+                threads=True
+            )
+        except Exception as e:
+            print(f"Error downloading prices for {symbols}: {e}")
+            return pd.DataFrame()
+
+        if data is None or data.empty:
+            return pd.DataFrame()
+
+        closes = data['Close']
+        if isinstance(closes, pd.Series):
+            closes = closes.to_frame(symbols[0])
+        closes = closes.dropna(how='all')
+        if closes.empty:
+            return closes
+
+        closes.index = pd.to_datetime(closes.index)
+        if closes.index.tz is not None:
+            closes.index = closes.index.tz_localize(None)
+        closes.index = closes.index.normalize()
+        return closes[~closes.index.duplicated(keep='last')]
+
+    def _merge(self, closes):
+        """Merges freshly downloaded bars into the panel (new values win)."""
+        if closes.empty:
+            return
+        self._closes = closes.combine_first(self._closes).sort_index()
+        now = time.time()
+        for symbol in closes.columns:
+            self._refreshed_at[symbol] = now
+        self.version += 1
+        self.updated_at = pd.Timestamp.now()
+
+    def _record_attempt(self, symbols, closes, now):
+        """Remembers which of the requested symbols came back without any close."""
+        loaded = set(closes.columns[closes.notna().any()]) if not closes.empty else set()
+        for symbol in symbols:
+            if symbol in loaded:
+                self._failed_at.pop(symbol, None)
+            else:
+                self._failed_at[symbol] = now
+
+    def get_closes(self, symbols, start_date):
+        """
+        Returns daily closes for the given resolved symbols from start_date on,
+        downloading only what the cache doesn't already hold.
+        """
+        symbols = list(dict.fromkeys(symbols))
+        if not symbols:
+            return pd.DataFrame()
+        start = pd.Timestamp(start_date)
+        if start.tz is not None:
+            start = start.tz_localize(None)
+        start = start.normalize()
+
+        with self._lock:
+            now = time.time()
+            # Failed recently: serve what we have until the retry delay has passed
+            retry = {s for s in symbols if now - self._failed_at.get(s, 0) > self.retry_seconds}
+
+            # Symbols never seen, or not loaded far enough back
+            missing = [s for s in symbols if s in retry and self._covered_from.get(s, pd.Timestamp.max) > start]
+            if missing:
+                closes = self._download(missing, start)
+                self._merge(closes)
+                self._record_attempt(missing, closes, now)
+                for symbol in closes.columns:
+                    self._covered_from[symbol] = min(start, self._covered_from.get(symbol, start))
+
+            # Cached symbols that may have new bars: fetch only from their last bar on
+            stale = [
+                s for s in symbols
+                if s in retry and s not in missing and s in self._closes.columns
+                and now - self._refreshed_at.get(s, 0) > self.refresh_seconds
+            ]
+            if stale:
+                last_bar = self._closes[stale].apply(lambda col: col.last_valid_index()).min()
+                closes = self._download(stale, last_bar)
+                self._merge(closes)
+                self._record_attempt(stale, closes, now)
+
+            panel = self._closes.reindex(columns=symbols)
+            panel = panel[panel.index >= start]
+            return panel.dropna(how='all').copy()
+
+_store = PriceStore()
+
+def get_store():
+    """Returns the price store shared by the whole process."""
+    return _store
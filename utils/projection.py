@@ -0,0 +1,134 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from utils.risk import daily_returns
+
+PERCENTILES = [5, 25, 50, 75, 95]
+
+def _block_growth(returns, period_days):
+    """
+    Growth factor of every run of `period_days` consecutive historical days (blocks x assets),
+    computed from cumulative log returns in one pass.
+    """
+    log_cum = np.vstack([np.zeros((1, returns.shape[1])), np.cumsum(np.log1p(returns), axis=0)])
+    return np.exp(log_cum[period_days:] - log_cum[:-period_days])
+
+def _simulate_chunk(task):
+    """
+    Simulates one chunk of paths and returns the total portfolio value at the end of
+    every period (paths x periods, float32). Runs in the caller or in a pool worker.
+    """
+    model, start_values, weights, contribution, n_paths, periods, method, seed = task
+    rng = np.random.default_rng(seed)
+    n_assets = len(start_values)
+
+    # Joint growth factors per period: paths x periods x assets
+    if method == "bootstrap":
+        # Resample whole blocks of historical days so cross-asset correlation is kept
+        idx = rng.integers(0, len(model), size=(n_paths, periods))
+        growth = model[idx]
+        del idx
+    else:
+        mean, chol = model
+        growth = rng.standard_normal((n_paths, periods, n_assets), dtype=np.float32) @ chol.T
+        growth += mean
+        np.exp(growth, out=growth)
+
+    # With C_p the cumulative growth and a contribution c added at the end of every period:
+    # V_p = C_p * (V_0 + c * sum_{k<=p} 1 / C_k)
+    np.cumprod(growth, axis=1, out=growth)
+    added = np.reciprocal(growth)
+    np.cumsum(added, axis=1, out=added)
+    added *= (contribution * weights).astype(np.float32)
+    added += start_values.astype(np.float32)
+    growth *= added
+    del added
+
+    # Sum over assets as a matrix product (much faster than a reduction over a short last axis)
+    return (growth.reshape(-1, n_assets) @ np.ones(n_assets, dtype=np.float32)).reshape(n_paths, periods)
+
+def simulate_projection(price_history_df, holdings_values, years=10, n_paths=10000,
+                        contribution=0.0, period_days=21, method="bootstrap",
+                        percentiles=PERCENTILES, memory_budget_mb=256,
+                        processes=None, seed=None):
+    """
+    Monte Carlo projection of the portfolio value.
+    price_history_df: daily close prices (index=Date, columns=tickers)
+    holdings_values: Series {ticker: current value}; contributions are split with the same weights
+    contribution: amount added at the end of every period
+    period_days: trading days per simulation step (21 = monthly)
+    method: "bootstrap" (resample blocks of historical days) or "normal" (multivariate normal fit
+            of daily log returns, aggregated to the period)
+    memory_budget_mb: bound for the result buffer plus the working arrays of the chunks in flight
+    processes: number of spawned worker processes for the chunks (None/1 runs in this process)
+    Returns a DataFrame indexed by future date with one column per percentile.
+    """
+    holdings_values = holdings_values[holdings_values > 0]
+    tickers = [t for t in holdings_values.index if t in price_history_df.columns]
+    if not tickers:
+        raise ValueError("No price history for the holdings")
+
+    # Only days where every held ETF has a return, so the draws are joint
+    returns = daily_returns(price_history_df[tickers]).dropna(how='any').to_numpy(dtype=float)
+    if len(returns) < period_days * 2:
+        raise ValueError("Not enough overlapping history to simulate")
+
+    if method == "bootstrap":
+        model = _block_growth(returns, period_days).astype(np.float32)
+    else:
+        log_returns = np.log1p(returns)
+        mean = log_returns.mean(axis=0) * period_days
+        cov = np.cov(log_returns, rowvar=False).reshape(len(tickers), len(tickers)) * period_days
+        chol = np.linalg.cholesky(cov + np.eye(len(tickers)) * 1e-12)
+        model = (mean.astype(np.float32), chol.astype(np.float32))
+
+    start_values = holdings_values[tickers].to_numpy(dtype=float)
+    weights = start_values / start_values.sum()
+    periods = max(1, int(round(years * 252 / period_days)))
+
+    # One (periods x paths) float32 buffer holds every path's total; chunks are written into it
+    # and the percentiles are taken in place, so the budget covers the result too
+    result_bytes = periods * n_paths * 4
+    workers = processes if processes and processes > 1 else 1
+    chunk_budget = (memory_budget_mb * 1024 ** 2 - result_bytes) / workers
+    # Per path in a chunk: two float32 (periods x assets) working arrays plus its totals
+    bytes_per_path = periods * len(tickers) * 4 * 2 + periods * 4
+    if chunk_budget < bytes_per_path:
+        raise ValueError(
+            f"{n_paths} paths over {periods} periods need more than {memory_budget_mb} MB; "
+            "lower the number of paths or raise memory_budget_mb"
+        )
+    chunk_paths = max(1, min(n_paths, int(chunk_budget // bytes_per_path)))
+    chunk_sizes = [chunk_paths] * (n_paths // chunk_paths)
+    if n_paths % chunk_paths:
+        chunk_sizes.append(n_paths % chunk_paths)
+
+    seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+    tasks = [
+        (model, start_values, weights, contribution, size, periods, method, chunk_seed)
+        for size, chunk_seed in zip(chunk_sizes, seeds)
+    ]
+    offsets = np.concatenate([[0], np.cumsum(chunk_sizes)])
+
+    totals = np.empty((periods, n_paths), dtype=np.float32)
+    if workers > 1 and len(tasks) > 1:
+        # Spawned (not forked) workers, and at most `workers` chunks in flight so results can't pile up
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            for window in range(0, len(tasks), workers):
+                futures = [pool.submit(_simulate_chunk, task) for task in tasks[window:window + workers]]
+                for i, future in enumerate(futures, start=window):
+                    totals[:, offsets[i]:offsets[i + 1]] = future.result().T
+                del futures
+    else:
+        for i, task in enumerate(tasks):
+            totals[:, offsets[i]:offsets[i + 1]] = _simulate_chunk(task).T
+
+    # Every percentile over a contiguous row, partitioning the buffer in place instead of copying it
+    bands = np.percentile(totals, percentiles, axis=1, overwrite_input=True).T
+
+    # Start the fan from today's value
+    today = pd.Timestamp.now().normalize()
+    dates = pd.bdate_range(today, periods=periods * period_days + 1)[::period_days]
+    bands = np.vstack([np.full(len(percentiles), start_values.sum()), bands])
+    return pd.DataFrame(bands, index=dates, columns=[f"P{p}" for p in percentiles])
@@ -0,0 +1,147 @@
+import numpy as np
+import pandas as pd
+from utils.risk import TRADING_DAYS, final_bars
+
+class CovarianceEstimator:
+    """
+    Running mean and covariance of daily returns.
+    New bars are merged into the running moments (batch Welford update),
+    so the matrix never has to be re-estimated from the whole history.
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.count = 0
+        self.last_date = None
+
+        n = len(self.columns)
+        self._mean = np.zeros(n)
+        self._m2 = np.zeros((n, n))
+
+    def update(self, returns_df):
+        """Merges the closed rows of returns_df that are newer than the last one seen."""
+        new_rows = final_bars(returns_df.reindex(columns=self.columns))
+        if self.last_date is not None:
+            new_rows = new_rows[new_rows.index > self.last_date]
+        # Only days where every column has a return
+        new_rows = new_rows.dropna(how='any')
+        if new_rows.empty:
+            return
+
+        batch = new_rows.to_numpy(dtype=float)
+        n_b = len(batch)
+        mean_b = batch.mean(axis=0)
+        centered = batch - mean_b
+        m2_b = centered.T @ centered
+
+        n_a = self.count
+        delta = mean_b - self._mean
+        total = n_a + n_b
+        self._mean = self._mean + delta * n_b / total
+        self._m2 = self._m2 + m2_b + np.outer(delta, delta) * n_a * n_b / total
+        self.count = total
+        self.last_date = new_rows.index[-1]
+
+    def mean(self, annualize=True):
+        mean = self._mean * (TRADING_DAYS if annualize else 1)
+        return pd.Series(mean, index=self.columns)
+
+    def covariance(self, annualize=True):
+        if self.count < 2:
+            return pd.DataFrame(np.nan, index=self.columns, columns=self.columns)
+        cov = self._m2 / (self.count - 1) * (TRADING_DAYS if annualize else 1)
+        return pd.DataFrame(cov, index=self.columns, columns=self.columns)
+
+def _project_to_simplex(w):
+    """Euclidean projection onto {w >= 0, sum(w) = 1} (sort-based, vectorized)."""
+    u = np.sort(w)[::-1]
+    cumulative = np.cumsum(u) - 1
+    ranks = np.arange(1, len(w) + 1)
+    rho = np.nonzero(u - cumulative / ranks > 0)[0][-1]
+    theta = cumulative[rho] / (rho + 1)
+    return np.clip(w - theta, 0, None)
+
+def mean_variance_weights(expected_returns, cov, risk_aversion=3.0, max_iter=500, tol=1e-10):
+    """
+    Long-only mean-variance weights: maximizes mu'w - (risk_aversion / 2) w'Cw with weights summing to 1.
+    Solved by projected gradient ascent. Use expected_returns of zero for minimum variance.
+    """
+    mu = np.asarray(expected_returns, dtype=float)
+    c = np.asarray(cov, dtype=float)
+    n = len(mu)
+
+    # Step size from the largest eigenvalue keeps the ascent stable
+    lipschitz = risk_aversion * np.linalg.eigvalsh(c).max()
+    step = 1 / lipschitz if lipschitz > 0 else 1.0
+
+    w = np.full(n, 1 / n)
+    for _ in range(max_iter):
+        gradient = mu - risk_aversion * (c @ w)
+        w_new = _project_to_simplex(w + step * gradient)
+        if np.abs(w_new - w).max() < tol:
+            w = w_new
+            break
+        w = w_new
+    return w
+
+def risk_parity_weights(cov, max_iter=500, tol=1e-10):
+    """
+    Weights where every asset contributes the same share of portfolio variance.
+    Multiplicative fixed-point iteration starting from inverse volatility.
+    """
+    c = np.asarray(cov, dtype=float)
+    vol = np.sqrt(np.diag(c))
+    w = np.where(vol > 0, 1 / vol, 0)
+    w = w / w.sum()
+
+    for _ in range(max_iter):
+        contributions = w * (c @ w)
+        target = contributions.sum() / len(w)
+        w_new = w * np.sqrt(target / np.where(contributions > 0, contributions, target))
+        w_new = w_new / w_new.sum()
+        if np.abs(w_new - w).max() < tol:
+            w = w_new
+            break
+        w = w_new
+    return w
+
+def compute_trades(holdings, prices, target_weights, cash=0.0, whole_shares=False):
+    """
+    Trades needed to move the current holdings (plus cash) to the target weights.
+    holdings: Series {ticker: quantity held}
+    prices: Series {ticker: current price}
+    target_weights: Series {ticker: weight}, normalized to sum to 1
+    whole_shares: round trade quantities toward zero
+    Returns (trades DataFrame, cash left after the trades).
+    """
+    tickers = list(dict.fromkeys(list(holdings.index) + list(target_weights.index)))
+    quantity = holdings.reindex(tickers).fillna(0).astype(float)
+    price = prices.reindex(tickers).astype(float)
+    weights = target_weights.reindex(tickers).fillna(0).clip(lower=0)
+    if weights.sum() > 0:
+        weights = weights / weights.sum()
+
+    current_value = (quantity * price).fillna(0)
+    total_value = current_value.sum() + cash
+
+    target_value = weights * total_value
+    trade_quantity = ((target_value - current_value) / price).where(price > 0, 0).fillna(0)
+    if whole_shares:
+        trade_quantity = np.trunc(trade_quantity)
+    trade_value = (trade_quantity * price).fillna(0)
+
+    trades = pd.DataFrame({
+        'Ticker': tickers,
+        'Current Value': current_value.values,
+        'Current Weight %': (current_value / total_value * 100).values if total_value else 0,
+        'Target Weight %': (weights * 100).values,
+        'Target Value': target_value.values,
+        'Trade Quantity': trade_quantity.values,
+        'Trade Value': trade_value.values,
+    })
+    trades['Action'] = np.select(
+        [trades['Trade Quantity'] > 1e-9, trades['Trade Quantity'] < -1e-9],
+        ['Buy', 'Sell'],
+        'Hold'
+    )
+    return trades, cash - trade_value.sum()
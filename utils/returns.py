@@ -0,0 +1,92 @@
+import numpy as np
+
+# Solve in log space, x = log(1 + r), so the rate can never drop below -100%.
+# The bracket covers annual rates from about -99.995% to +2,200,000%.
+LOG_RATE_BOUND = 10.0
+
+def _npv(cashflows, years, x):
+    """NPV and its derivative for every row at log-rate x (one value per row)."""
+    with np.errstate(over='ignore', invalid='ignore'):
+        discount = np.exp(-x[:, None] * years)
+        npv = (cashflows * discount).sum(axis=1)
+        d_npv = (-years * cashflows * discount).sum(axis=1)
+    return npv, d_npv
+
+def xirr(cashflows, years, tol=1e-10, max_iter=100):
+    """
+    Solves the money-weighted return (XIRR) of many cash flow series at once.
+    cashflows: 2D array (series x flows), investments negative, proceeds/value positive,
+               padded with zeros for shorter series
+    years: 2D array of the same shape with the time of each flow in years
+    Returns a 1D array of annual rates (NaN where no rate exists).
+
+    Safeguarded Newton: every row keeps a sign-changing bracket and falls back
+    to bisection whenever a Newton step would leave it.
+    """
+    cashflows = np.asarray(cashflows, dtype=float)
+    years = np.asarray(years, dtype=float)
+    n = cashflows.shape[0]
+
+    lo = np.full(n, -LOG_RATE_BOUND)
+    hi = np.full(n, LOG_RATE_BOUND)
+    f_lo, _ = _npv(cashflows, years, lo)
+    f_hi, _ = _npv(cashflows, years, hi)
+
+    # Rows without a sign change in the bracket have no solution
+    valid = np.isfinite(f_lo) & np.isfinite(f_hi) & (np.sign(f_lo) != np.sign(f_hi))
+
+    x = np.zeros(n)
+    for _ in range(max_iter):
+        f, d_f = _npv(cashflows, years, x)
+
+        # Shrink the bracket around the root
+        on_lo_side = np.sign(f) == np.sign(f_lo)
+        lo = np.where(on_lo_side, x, lo)
+        f_lo = np.where(on_lo_side, f, f_lo)
+        hi = np.where(on_lo_side, hi, x)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_new = x - f / d_f
+        outside = ~np.isfinite(x_new) | (x_new <= lo) | (x_new >= hi)
+        x_new = np.where(outside, (lo + hi) / 2, x_new)
+        # An exact root stays put (it sits on the bracket edge, which would force a bisection step)
+        x_new = np.where(f == 0, x, x_new)
+
+        converged = (np.abs(x_new - x) < tol) | (f == 0)
+        x = x_new
+        if np.all(converged | ~valid):
+            break
+
+    return np.where(valid, np.expm1(x), np.nan)
+
+def time_weighted_return(market_value, buys, sells):
+    """
+    Chains daily sub-period returns for many series at once.
+    market_value: 2D array (days x series) of end-of-day value
+    buys: 2D array of money invested each day (treated as start-of-day flows)
+    sells: 2D array of proceeds each day (treated as end-of-day flows)
+    Returns a 1D array with the cumulative return of each series (NaN if never held).
+    """
+    market_value = np.asarray(market_value, dtype=float)
+    buys = np.asarray(buys, dtype=float)
+    sells = np.asarray(sells, dtype=float)
+
+    previous_value = np.vstack([np.zeros((1, market_value.shape[1])), market_value[:-1]])
+    start = previous_value + buys
+    end = market_value + sells
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = end / start
+    # Days without capital at work don't count
+    held = (start > 0) & np.isfinite(growth)
+    growth = np.where(held, growth, 1.0)
+
+    result = np.prod(growth, axis=0) - 1
+    return np.where(held.any(axis=0), result, np.nan)
+
+def annualize(total_return, years):
+    """Converts cumulative returns into annual rates (vectorized)."""
+    total_return = np.asarray(total_return, dtype=float)
+    years = np.asarray(years, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(years > 0, (1 + total_return) ** (1 / years) - 1, np.nan)
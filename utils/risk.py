@@ -0,0 +1,200 @@
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+
+def daily_returns(price_history_df):
+    """
+    Computes simple daily returns from a price panel (index=Date, columns=tickers).
+    Gaps are forward-filled first so holidays don't show up as missing returns.
+    """
+    if price_history_df.empty:
+        return pd.DataFrame()
+    return price_history_df.ffill().pct_change(fill_method=None).iloc[1:]
+
+def final_bars(returns_df):
+    """
+    Drops today's bar: during the session it holds the latest quote, not the close,
+    and would change after being merged into a running estimate.
+    """
+    if returns_df.empty:
+        return returns_df
+    return returns_df[returns_df.index < pd.Timestamp.now().normalize()]
+
+def rolling_volatility(price_history_df, window=21, annualize=True):
+    """
+    Rolling standard deviation of daily returns for every ticker at once.
+    Returns a DataFrame aligned with the price panel (annualized by default).
+    """
+    returns = daily_returns(price_history_df)
+    vol = returns.rolling(window, min_periods=window).std()
+    if annualize:
+        vol = vol * np.sqrt(TRADING_DAYS)
+    return vol
+
+def drawdowns(price_history_df):
+    """
+    Drawdown from the running peak for every ticker (0 at a new high, negative below it).
+    """
+    prices = price_history_df.ffill()
+    return prices / prices.cummax() - 1
+
+def max_drawdown(price_history_df):
+    """
+    Maximum drawdown per ticker as a (negative) fraction.
+    """
+    if price_history_df.empty:
+        return pd.Series(dtype=float)
+    return drawdowns(price_history_df).min()
+
+def sharpe_ratio(returns_df, risk_free_rate=0.0):
+    """
+    Annualized Sharpe ratio per ticker.
+    risk_free_rate: annual rate as a fraction (e.g. 0.02 for 2%)
+    """
+    excess = returns_df - risk_free_rate / TRADING_DAYS
+    std = excess.std()
+    return (excess.mean() / std.replace(0, np.nan)) * np.sqrt(TRADING_DAYS)
+
+def sortino_ratio(returns_df, risk_free_rate=0.0):
+    """
+    Annualized Sortino ratio per ticker (downside deviation below the risk-free rate).
+    """
+    excess = returns_df - risk_free_rate / TRADING_DAYS
+    downside = np.sqrt((excess.clip(upper=0) ** 2).mean())
+    return (excess.mean() / downside.replace(0, np.nan)) * np.sqrt(TRADING_DAYS)
+
+def beta(returns_df, benchmark_returns):
+    """
+    Beta of every ticker against a benchmark return series.
+    Only days where both the ticker and the benchmark have a return are used.
+    """
+    r = returns_df.to_numpy(dtype=float)
+    b = benchmark_returns.reindex(returns_df.index).to_numpy(dtype=float)[:, None]
+
+    valid = ~np.isnan(r) & ~np.isnan(b)
+    count = valid.sum(axis=0)
+    r0 = np.where(valid, r, 0.0)
+    b0 = np.where(valid, b, 0.0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_r = r0.sum(axis=0) / count
+        mean_b = b0.sum(axis=0) / count
+        cov = (np.where(valid, (r0 - mean_r) * (b0 - mean_b), 0.0)).sum(axis=0) / (count - 1)
+        var_b = (np.where(valid, (b0 - mean_b) ** 2, 0.0)).sum(axis=0) / (count - 1)
+        result = cov / var_b
+
+    return pd.Series(result, index=returns_df.columns)
+
+def correlation_matrix(price_history_df):
+    """
+    Pairwise correlation of daily returns for all tickers in the panel.
+    Same result as DataFrame.corr() (each pair over the days both have a return),
+    computed with masked matrix products instead of a loop over pairs.
+    """
+    returns = daily_returns(price_history_df)
+    if returns.empty:
+        return pd.DataFrame()
+
+    values = returns.to_numpy(dtype=float)
+    mask = ~np.isnan(values)
+    # Centering first keeps the one-pass sums accurate; correlation doesn't change with a shift
+    with np.errstate(invalid='ignore'):
+        centered = np.where(mask, values - np.nanmean(values, axis=0), 0.0)
+    present = mask.astype(float)
+
+    count = present.T @ present
+    sum_x = centered.T @ present            # sum of column i over the days column j is present too
+    sum_xx = (centered ** 2).T @ present
+    sum_xy = centered.T @ centered
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = sum_xy - sum_x * sum_x.T / count
+        var_x = sum_xx - sum_x ** 2 / count
+        corr = cov / np.sqrt(var_x * var_x.T)
+    corr = np.where((count >= 2) & (var_x > 0) & (var_x.T > 0), np.clip(corr, -1.0, 1.0), np.nan)
+    return pd.DataFrame(corr, index=returns.columns, columns=returns.columns)
+
+def risk_summary(price_history_df, benchmark=None, risk_free_rate=0.0):
+    """
+    Builds one risk table for all tickers in the price panel.
+    benchmark: column of the panel to compute beta against (optional)
+    """
+    returns = daily_returns(price_history_df)
+    if returns.empty:
+        return pd.DataFrame()
+
+    summary = pd.DataFrame({
+        'Volatility %': returns.std() * np.sqrt(TRADING_DAYS) * 100,
+        'Max Drawdown %': max_drawdown(price_history_df) * 100,
+        'Sharpe': sharpe_ratio(returns, risk_free_rate),
+        'Sortino': sortino_ratio(returns, risk_free_rate),
+    })
+    if benchmark is not None and benchmark in returns.columns:
+        summary['Beta'] = beta(returns, returns[benchmark])
+
+    summary.index.name = 'Ticker'
+    return summary.reset_index()
+
+class RollingStats:
+    """
+    Incremental rolling mean/volatility over the last `window` daily returns.
+    Each new bar updates running sums in O(tickers) instead of recomputing the window.
+    """
+
+    def __init__(self, columns, window=21):
+        self.columns = list(columns)
+        self.window = window
+        self.last_date = None
+
+        n = len(self.columns)
+        self._buffer = np.full((window, n), np.nan)
+        self._pos = 0
+        self._sum = np.zeros(n)
+        self._sumsq = np.zeros(n)
+        self._count = np.zeros(n)
+
+    def update(self, returns_row, date=None):
+        """Pushes one bar of returns (one value per column) into the window."""
+        row = np.asarray(returns_row, dtype=float)
+
+        # Drop the bar that falls out of the window
+        old = self._buffer[self._pos]
+        old_valid = ~np.isnan(old)
+        self._sum -= np.where(old_valid, old, 0.0)
+        self._sumsq -= np.where(old_valid, old ** 2, 0.0)
+        self._count -= old_valid
+
+        new_valid = ~np.isnan(row)
+        self._sum += np.where(new_valid, row, 0.0)
+        self._sumsq += np.where(new_valid, row ** 2, 0.0)
+        self._count += new_valid
+
+        self._buffer[self._pos] = row
+        self._pos = (self._pos + 1) % self.window
+        if date is not None:
+            self.last_date = date
+
+    def extend(self, returns_df):
+        """Pushes only the closed bars of returns_df that are newer than the last one seen."""
+        new_rows = final_bars(returns_df.reindex(columns=self.columns))
+        if self.last_date is not None:
+            new_rows = new_rows[new_rows.index > self.last_date]
+        # Older bars would be evicted anyway
+        new_rows = new_rows.tail(self.window)
+
+        for date, row in zip(new_rows.index, new_rows.to_numpy(dtype=float)):
+            self.update(row, date)
+
+    def mean(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return pd.Series(self._sum / self._count, index=self.columns)
+
+    def volatility(self, annualize=True):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            var = (self._sumsq - self._sum ** 2 / self._count) / (self._count - 1)
+        # Running sums can drift slightly below zero on flat series
+        vol = np.sqrt(np.clip(var, 0, None))
+        vol = np.where(self._count >= 2, vol, np.nan)
+        if annualize:
+            vol = vol * np.sqrt(TRADING_DAYS)
+        return pd.Series(vol, index=self.columns)
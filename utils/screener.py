@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+from utils.risk import TRADING_DAYS
+
+def _prices_at(prices, date):
+    """Last price of every column on or before `date` (NaN where there is none)."""
+    before = prices[prices.index <= date]
+    if before.empty:
+        return pd.Series(np.nan, index=prices.columns)
+    return before.iloc[-1]
+
+def screen(price_history_df, ma_window=200):
+    """
+    Builds the screener table for every symbol of a daily price panel in one pass.
+    The panel should cover at least one year plus `ma_window` trading days.
+    Returns a DataFrame with one row per symbol.
+    """
+    if price_history_df.empty:
+        return pd.DataFrame()
+
+    # Align exchanges with different holidays
+    prices = price_history_df.ffill()
+    last_date = prices.index[-1]
+    last = prices.iloc[-1]
+
+    table = pd.DataFrame(index=prices.columns)
+    table['Last Price'] = last
+    table['1D %'] = (last / prices.iloc[-2] - 1) * 100 if len(prices) > 1 else np.nan
+    table['1M %'] = (last / _prices_at(prices, last_date - pd.DateOffset(months=1)) - 1) * 100
+    table['3M %'] = (last / _prices_at(prices, last_date - pd.DateOffset(months=3)) - 1) * 100
+    # YTD is measured from the last close of the previous year
+    table['YTD %'] = (last / _prices_at(prices, last_date.replace(month=1, day=1) - pd.Timedelta(days=1)) - 1) * 100
+    table['1Y %'] = (last / _prices_at(prices, last_date - pd.DateOffset(years=1)) - 1) * 100
+
+    last_year = prices.iloc[-TRADING_DAYS:]
+    returns = last_year.pct_change(fill_method=None)
+    table['Volatility %'] = returns.std() * np.sqrt(TRADING_DAYS) * 100
+    table['From High %'] = (last / last_year.max() - 1) * 100
+
+    ma_prices = prices.iloc[-ma_window:]
+    moving_average = ma_prices.mean().where(ma_prices.count() >= ma_window)
+    table[f'vs {ma_window}D MA %'] = (last / moving_average - 1) * 100
+
+    table.index.name = 'Symbol'
+    return table.reset_index()
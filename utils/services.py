@@ -0,0 +1,48 @@
+"""
+Background services of the app process (JSON API, alert engine), started once
+per process before the login gate so they don't wait for a browser session.
+Only the standard library is imported here: the services import their own
+modules (numpy, pandas) from a background thread, so the login page never
+waits for them.
+"""
+import os
+import threading
+
+_started = False
+_lock = threading.Lock()
+
+def _start_alerts(webhook_url, alerts_file):
+    # No rules saved yet: nothing to evaluate, and the Alerts tab starts the engine when one is added
+    if not os.path.exists(alerts_file):
+        return
+    from utils import alerts
+
+    engine = alerts.get_engine(webhook_url)
+    if not alerts.load_rules(alerts_file).empty:
+        engine.start()
+
+def _start_api(api_port, api_token, base_currency):
+    import api
+
+    try:
+        api.start_server(int(api_port), token=api_token, base_currency=base_currency)
+    except OSError as e:
+        print(f"Could not start JSON API: {e}")
+
+def _run(api_port, api_token, base_currency, webhook_url, alerts_file):
+    # The JSON API lives in this process so it shares the price cache; it has its own token
+    if api_port:
+        _start_api(api_port, api_token, base_currency)
+    try:
+        _start_alerts(webhook_url, alerts_file)
+    except Exception as e:
+        print(f"Could not start alert engine: {e}")
+
+def start(api_port=None, api_token=None, base_currency="EUR", webhook_url="", alerts_file="alerts.json"):
+    """Starts the JSON API (if api_port is set) and the alert engine in the background (once per process)."""
+    global _started
+    with _lock:
+        if _started:
+            return
+        _started = True
+    threading.Thread(target=_run, args=(api_port, api_token, base_currency, webhook_url, alerts_file), name="service-start", daemon=True).start()
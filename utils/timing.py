@@ -0,0 +1,31 @@
+import time
+
+class StartupTimer:
+    """
+    Records how long each phase of a script run takes.
+    Call mark() at the end of every phase; report() lists the phases in order.
+    """
+
+    def __init__(self, start=None):
+        self.start = start if start is not None else time.perf_counter()
+        self.phases = []
+        self._last = self.start
+
+    def mark(self, label):
+        now = time.perf_counter()
+        self.phases.append((label, now - self._last))
+        self._last = now
+
+    def total(self):
+        return self._last - self.start
+
+    def report(self):
+        """Returns the phases as a list of dicts (milliseconds), including the total."""
+        rows = [{'Phase': label, 'ms': seconds * 1000} for label, seconds in self.phases]
+        rows.append({'Phase': 'Total', 'ms': self.total() * 1000})
+        return rows
+
+    def log(self, prefix="startup"):
+        """Prints one line with all phases, e.g. for the server log."""
+        parts = [f"{row['Phase']}={row['ms']:.0f}ms" for row in self.report()]
+        print(f"[{prefix}] " + " ".join(parts))
@@ -1,6 +1,3 @@
-import gspread
-from google.oauth2.service_account import Credentials
-
 SCOPES = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive']
 
 def get_gsheets_client():
@@ -8,6 +5,9 @@ def get_gsheets_client():
     try:
         import streamlit as st
         if "gcp_service_account" in st.secrets:
+            # Only pay for the Google client libraries when Sheets is configured
+            import gspread
+            from google.oauth2.service_account import Credentials
             credentials_dict = dict(st.secrets["gcp_service_account"])
             creds = Credentials.from_service_account_info(credentials_dict, scopes=SCOPES)
             return gspread.authorize(creds)